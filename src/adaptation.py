@@ -0,0 +1,135 @@
+# adaptation.py - online control of the cultural algorithm's operator rates
+#
+# with cultural_algorithm(..., adaptive=True) the rates are no longer constants:
+#   - diversity: mean normalised entropy of the combinations each cage uses across
+#     the population (1 = all different, 0 = every individual agrees)
+#   - credit: a child whose fitness beats the mean of its two selected parents counts
+#     as a success for every operator that changed it; each operator's success rate
+#     is smoothed over the generations
+#   - rates: each operator's rate follows its success rate relative to the others, and
+#     all of them (plus the acceptance ratio) rise when diversity drops below the target
+#   - restarts: when diversity collapses part of the population is re-sampled,
+#     instead of waiting for a fixed number of stagnant generations
+#
+#   python -m src.adaptation "7x7 Puzzle" --no-propagation --seed 0 --out trace.csv
+
+import argparse
+import csv
+import math
+import sys
+from collections import Counter
+
+from src.utils import PUZZLES, puzzle_size
+
+OPERATORS = ("mutation", "permutation", "structural", "normative")
+TARGET_DIVERSITY = 0.35
+RESTART_DIVERSITY = 0.12
+RESTART_FRACTION = 0.25  # share of the population re-sampled on a restart
+MEMORY = 0.8  # weight of the old success rate when a generation's credit comes in
+RATE_BOUNDS = (0.01, 0.6)
+ACCEPTANCE_BOUNDS = (0.05, 0.5)
+
+
+def clamp(x, lo, hi):
+    return max(lo, min(hi, x))
+
+
+# mean over cages of the entropy of the chosen combinations, divided by the highest
+# entropy possible for that cage; cages with a single combination are left out
+def population_diversity(population, cage_domains):
+    P = len(population)
+    total = 0.0
+    counted = 0
+    for i, domain in enumerate(cage_domains):
+        k = min(len(domain), P)
+        if k < 2:
+            continue
+        counts = Counter(ind[i] for ind in population)
+        h = -sum(c / P * math.log(c / P) for c in counts.values())
+        total += min(1.0, h / math.log(k))
+        counted += 1
+    return total / counted if counted else 0.0
+
+
+class RateController:
+    def __init__(self, rates, acceptance_ratio, target_diversity=TARGET_DIVERSITY,
+                 restart_diversity=RESTART_DIVERSITY):
+        self.base = dict(rates)
+        self.rates = dict(rates)
+        self.base_acceptance = acceptance_ratio
+        self.acceptance = acceptance_ratio
+        self.target_diversity = target_diversity
+        self.restart_diversity = restart_diversity
+
+        self.quality = {op: 0.5 for op in rates}  # smoothed success rate per operator
+        self.uses = {op: 0 for op in rates}
+        self.wins = {op: 0 for op in rates}
+        self.diversity = 1.0
+        self.restarts = 0
+
+    # one child was scored: `ops` changed it, `parent_fit` is what it had to beat
+    def credit(self, ops, parent_fit, child_fit):
+        improved = child_fit < parent_fit
+        for op in ops:
+            self.uses[op] += 1
+            self.wins[op] += improved
+
+    # end of a generation: fold in the credit, set the new rates.
+    # returns True when diversity is low enough for a partial restart
+    def update(self, diversity):
+        self.diversity = diversity
+        for op in self.rates:
+            if self.uses[op]:
+                self.quality[op] = MEMORY * self.quality[op] + \
+                                   (1 - MEMORY) * self.wins[op] / self.uses[op]
+            self.uses[op] = self.wins[op] = 0
+
+        mean_q = sum(self.quality.values()) / len(self.quality)
+        pressure = clamp(self.target_diversity / max(diversity, 1e-3), 0.5, 2.0)
+        for op in self.rates:
+            share = self.quality[op] / mean_q if mean_q > 0 else 1.0
+            self.rates[op] = clamp(self.base[op] * share * pressure, *RATE_BOUNDS)
+        self.acceptance = clamp(self.base_acceptance * pressure, *ACCEPTANCE_BOUNDS)
+
+        if diversity < self.restart_diversity:
+            self.restarts += 1
+            return True
+        return False
+
+    # current state, one row of the rate trajectory
+    def snapshot(self):
+        return dict(self.rates, acceptance=self.acceptance, diversity=self.diversity)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Per-generation rate trajectory of the adaptive CA")
+    ap.add_argument("puzzle", choices=sorted(PUZZLES))
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--generations", type=int, default=5000)
+    ap.add_argument("--fixed", action="store_true", help="trace the fixed-rate CA instead")
+    ap.add_argument("--no-propagation", action="store_true",
+                    help="skip propagation (it solves most stored puzzles before generation 0)")
+    ap.add_argument("--out", help="csv file, printed to stdout when left out")
+    args = ap.parse_args(argv)
+
+    from src.algorithm1 import cultural_algorithm  # algorithm1 imports this module
+
+    cages = PUZZLES[args.puzzle]
+    trace = []
+    _, fit, t, gens = cultural_algorithm(cages, puzzle_size(cages), generations=args.generations,
+                                         seed=args.seed, adaptive=not args.fixed,
+                                         use_propagation=not args.no_propagation, trace=trace)
+    fields = ["gen", "best", "diversity", *OPERATORS, "acceptance", "restart"]
+    f = open(args.out, "w", newline="", encoding="utf-8") if args.out else sys.stdout
+    try:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        writer.writerows(trace)
+    finally:
+        if args.out:
+            f.close()
+    print(f"fitness {fit} after {gens} generations in {t:.3f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,101 +1,70 @@
 # algorithm1.py - cultural algorithm solver
 
+import heapq
+import math
 import random
 import time
 from copy import deepcopy
 
+from src.cages import cage_valid, generate_cage_combinations
+from src.propagation import propagate, is_consistent, solved_board
+from src.adaptation import RESTART_FRACTION, RateController, population_diversity
+from src.belief_store import BeliefStore
+from src.repair import AssignmentRepair
 
+# operator rates of the fixed-rate CA (mutation_rate is a parameter)
+PERMUTATION_RATE = 0.18
+STRUCTURAL_RATE = 0.10
+NORMATIVE_RATE = 0.10
 
-# check if cage is satisfied by certain given values
-def cage_valid(values, target, op):
-    if op == '+':
-        return sum(values) == target
-    if op == '-':
-        return len(values) == 2 and abs(values[0] - values[1]) == target
-    if op == '*':
-        p = 1
-        for v in values:
-            p *= v
-        return p == target
-    if op == '/':
-        if len(values) != 2 or 0 in values:
-            return False
-        a, b = values
-        return max(a, b) / min(a, b) == target
-    if op == '=':
-        return values[0] == target
-    return False
-
-
-# it is to generate all possible sequences of numbers in certain length (repeat) 
-def product(values, repeat):
-    if repeat == 1:
-        for v in values:
-            yield (v,)
-        return
-    for v in values:
-        for rest in product(values, repeat - 1):
-            yield (v,) + rest
 
+# evaluating fitness function
+def evaluate_fitness(grid, cages, n):
+    row_pen = 0
+    col_pen = 0
+    cage_pen = 0
 
-# to identify all valid number combinations that appear inside cage
-def generate_cage_combinations(cells, target, op, n):
-    k = len(cells)
-    values = range(1, n+1)
-    combos = []
+    for r in range(n):
+        row_pen += n - len(set(grid[r]))
 
-    if op == '=':
-        return [[target]]
+    for c in range(n):
+        col = [grid[r][c] for r in range(n)]
+        col_pen += n - len(set(col))
 
-    if op == '-':
-        for a in values:
-            for b in values:
-                if abs(a - b) == target:
-                    combos.append([a, b])
-        return combos
+    for cells, target, op in cages:
+        vals = [grid[r][c] for (r, c) in cells]
+        if not cage_valid(vals, target, op):
+            cage_pen += 1
 
-    if op == '/':
-        for a in values:
-            for b in values:
-                if a != 0 and b != 0 and max(a,b)/min(a,b) == target:
-                    combos.append([a, b])
-        return combos
+    return row_pen + col_pen + cage_pen * 7  #added weight to cage penalty ~ youssef241784
 
-    if op == '+':
-        if k == 2:
-            for a in values:
-                for b in values:
-                    if a + b == target:
-                        combos.append([a, b])
-        else:
-            for cand in product(values, repeat=k):
-                if sum(cand) == target:
-                    combos.append(list(cand))
-        return combos
 
+# how far a cage is from its target, 0 when satisfied and about 1 for a clear miss
+def cage_distance(values, target, op):
+    if cage_valid(values, target, op):
+        return 0.0
+    if op == '+':
+        return min(1.0, abs(sum(values) - target) / target)
     if op == '*':
-        if k == 2:
-            for a in values:
-                for b in values:
-                    if a * b == target:
-                        combos.append([a, b])
-        else:
-            for cand in product(values, repeat=k):
-                p = 1
-                for v in cand:
-                    p *= v
-                if p == target:
-                    combos.append(list(cand))
-        return combos
-
-    return combos
+        p = 1
+        for v in values:
+            p *= v
+        return min(1.0, abs(math.log(p / target)))
+    if op == '-':
+        return min(1.0, abs(abs(values[0] - values[1]) - target) / target)
+    if op == '/':
+        a, b = max(values), min(values)
+        return min(1.0, abs(math.log(a / b / target)))
+    return 1.0
 
 
-# evaluating fitness function
-def evaluate_fitness(grid, cages, n):
+# graded fitness: a violated cage costs between half and the full weight of 7 depending on
+# how close it is, so the search can tell "almost right" cages from hopeless ones.
+# still 0 only for a solved grid
+def evaluate_fitness_graded(grid, cages, n):
     row_pen = 0
     col_pen = 0
-    cage_pen = 0
+    cage_pen = 0.0
 
     for r in range(n):
         row_pen += n - len(set(grid[r]))
@@ -105,11 +74,53 @@ def evaluate_fitness(grid, cages, n):
         col_pen += n - len(set(col))
 
     for cells, target, op in cages:
-        vals = [grid[r][c] for (r, c) in cells]
-        if not cage_valid(vals, target, op):
-            cage_pen += 1
+        d = cage_distance([grid[r][c] for (r, c) in cells], target, op)
+        if d > 0:
+            cage_pen += 0.5 + 0.5 * d
 
-    return row_pen + col_pen + cage_pen * 7  #added weight to cage penalty ~ youssef241784
+    return row_pen + col_pen + cage_pen * 7
+
+
+FITNESS_FUNCTIONS = {
+    "binary": evaluate_fitness,
+    "graded": evaluate_fitness_graded,
+}
+
+
+# selection strategies: given the scored population [(fit, indiv), ...] they return
+# the elites (used for the normative knowledge) and a function that picks one parent.
+# all of them use partial selection (heapq) instead of sorting the whole population
+
+# uniform picks from the top elite_count (the original behaviour)
+def select_truncation(scored, elite_count):
+    top = heapq.nsmallest(elite_count, scored, key=lambda x: x[0])
+    elites = [ind for _, ind in top]
+    return elites, lambda: random.choice(elites)
+
+
+# best of `size` random individuals from the whole population
+def select_tournament(scored, elite_count, size=3):
+    top = heapq.nsmallest(elite_count, scored, key=lambda x: x[0])
+    elites = [ind for _, ind in top]
+
+    def pick():
+        return min(random.sample(scored, min(size, len(scored))), key=lambda x: x[0])[1]
+    return elites, pick
+
+
+# linear ranking inside the top elite_count, the best gets elite_count times the weight of the last
+def select_rank(scored, elite_count):
+    top = heapq.nsmallest(elite_count, scored, key=lambda x: x[0])
+    elites = [ind for _, ind in top]
+    weights = list(range(len(elites), 0, -1))
+    return elites, lambda: random.choices(elites, weights)[0]
+
+
+SELECTION_STRATEGIES = {
+    "truncation": select_truncation,
+    "tournament": select_tournament,
+    "rank": select_rank,
+}
 
 
 # build the full grid from assignments
@@ -123,7 +134,7 @@ def build_grid(assignments, cages, n):
 
 
 # structure repair to fix latin square violations ( duplicated numbers in row andd column)
-def repair_latin(grid, n):
+def repair_latin(grid, n, rng=random):
     g = deepcopy(grid)
 
     # to fix rows
@@ -137,7 +148,7 @@ def repair_latin(grid, n):
                 if v in seen:
                     dups.append(c)
                 seen.add(v)
-            random.shuffle(missing)
+            rng.shuffle(missing)
             for cc,val in zip(dups,missing):
                 g[r][cc] = val
 
@@ -152,13 +163,25 @@ def repair_latin(grid, n):
                 if v in seen:
                     dups.append(r)
                 seen.add(v)
-            random.shuffle(missing)
+            rng.shuffle(missing)
             for rr,val in zip(dups,missing):
                 g[rr][c] = val
 
     return g
 
 
+# repaired grid and fitness of every individual. individual k is repaired with
+# random.Random(seed + k), the same as the worker processes in parallel.py do
+def score_population(population, cages, n, fitness_fn, seed, repair=repair_latin):
+    fits = []
+    grids = []
+    for k, indiv in enumerate(population):
+        grid = repair(build_grid(indiv, cages, n), n, random.Random(seed + k))
+        fits.append(fitness_fn(grid, cages, n))
+        grids.append(grid)
+    return fits, grids
+
+
 # function to swap two cages positions in a trial to escape a trap
 def structural_swap(assignments, cages, n):
 
@@ -186,6 +209,13 @@ def structural_swap(assignments, cages, n):
     return new
 
 
+# Latin repair operators by name: "assignment" is built per puzzle (repair.py)
+REPAIR_FUNCTIONS = {
+    "random": lambda cages, n: repair_latin,
+    "assignment": AssignmentRepair,
+}
+
+
 # cultural algorithm solve loop
 def cultural_algorithm(
     cages, #puzzle that is required to be solved
@@ -196,13 +226,39 @@ def cultural_algorithm(
     acceptance_ratio=0.19, # [elitism] percentage of top combinations that are going to affect the upcoming generation    also: #0.19 best for 7x7
     update_interval=10, # determines the gui update in terms of generations
     gui_callback=None,
-    should_stop=lambda: False # used for force-stop button in gui
+    should_stop=lambda: False, # used for force-stop button in gui
+    time_limit=None, # seconds, when it runs out the best grid found so far is returned
+    use_propagation=True, # prune the cage domains with constraint propagation first
+    fitness="binary", # name from FITNESS_FUNCTIONS or a function(grid, cages, n)
+    selection="truncation", # name from SELECTION_STRATEGIES or a function(scored, elite_count)
+    seed=None, # seeds the random module for repeatable runs
+    workers=None, # score each generation in this many processes (worth it for big pop_size)
+    beliefs=None, # BeliefStore or its path: warm start from earlier runs, and remember this one
+    adaptive=False, # adjust operator rates and acceptance ratio online (see adaptation.py)
+    trace=None, # list, gets one dict of rates/diversity per generation
+    repair="assignment" # name from REPAIR_FUNCTIONS or a function(grid, n, rng)
 ):
+    fitness_fn = FITNESS_FUNCTIONS[fitness] if isinstance(fitness, str) else fitness
+    select = SELECTION_STRATEGIES[selection] if isinstance(selection, str) else selection
+    repair_fn = REPAIR_FUNCTIONS[repair](cages, n) if isinstance(repair, str) else repair
+    if seed is not None:
+        random.seed(seed)
+
+    start = time.time()
+
+    # calculate valid number sets for each cage in the puzzle, pruned by constraint propagation
+    pruned = [[] for _ in cages]
+    if use_propagation:
+        cell_domains, pruned = propagate(cages, n)
+        board = solved_board(cell_domains) if is_consistent(cell_domains, pruned) else None
+        if board is not None: # propagation alone solved it
+            return board, 0, time.time()-start, 0
 
-    # calculate valid number sets for each cage in the puzzle
     cage_domains = []
-    for cells, target, op in cages:
-        combos = generate_cage_combinations(cells, target, op, n)
+    for i, (cells, target, op) in enumerate(cages):
+        combos = pruned[i]
+        if not combos: # no propagation or a contradiction, use the raw combinations
+            combos = generate_cage_combinations(cells, target, op, n)
         if not combos:
             combos = [[random.randint(1,n) for _ in cells]]
         cage_domains.append([tuple(c) for c in combos])
@@ -217,124 +273,223 @@ def cultural_algorithm(
 
     #intializing the belief space ( the main idea of cultural algorithm )
     situational = None #the best individual ever found
+    situational_fit = None
+    situational_grid = None # its repaired grid, what the belief store remembers
     normative = [set(domain) for domain in cage_domains] #the values that are learned from the best individuals
 
+    # warm start from the belief space of earlier runs on this puzzle or on cages like its cages
+    known = None
+    if beliefs is not None:
+        if isinstance(beliefs, str):
+            beliefs = BeliefStore(beliefs)
+        known = beliefs.lookup(cages, n)
+        seed_best = list(population[0])
+        for i, combos in enumerate(known["normative"]):
+            kept = [c for c in combos or () if c in cage_domains[i]]
+            if kept:
+                normative[i] = set(kept)
+                seed_best[i] = kept[0] # lists start with the best run's combination
+        # half the population is drawn from the remembered sets, plus the best individual
+        # of this puzzle or, for a new puzzle, one built from the best known cage combinations
+        for k in range(pop_size // 2):
+            population[k] = [random.choice(list(normative[i])) for i in range(C)]
+        if known["best"] is not None:
+            # only combinations this run can use, whatever the store holds
+            seed_best = [combo if combo in cage_domains[i] else seed_best[i]
+                         for i, combo in enumerate(known["best"])]
+        population[0] = seed_best
+
     prev_best = 99999 #high fitness to compare with the first candidate fitness to successfully initialize it
     stagnation = 0
 
-    start = time.time()
-
-    # main generation loop
-    for gen in range(generations):
-
-        if should_stop(): #to check if user pressed force stop in gui
-            break
-
-        # does the main functions & then scores it based on cage/row/column violations
-        scored = []
-        for indiv in population:
-            grid = build_grid(indiv, cages, n)
-            grid = repair_latin(grid, n)
-            fit = evaluate_fitness(grid, cages, n)
-            scored.append((fit, indiv, grid))
-
-        scored.sort(key=lambda x: x[0]) #sorting of population in terms of fitness score
-        best_fit, best_indiv, best_grid = scored[0]
+    deadline = start + time_limit if time_limit is not None else None
 
-        # --- GUI update ---
-        if gui_callback and gen % update_interval == 0:
-            gui_callback(best_grid, best_fit, gen)
+    # best grid over all generations, returned when stopped early
+    best_ever = (99999, None)
+    gen = 0
 
+    rates = {"mutation": mutation_rate, "permutation": PERMUTATION_RATE,
+             "structural": STRUCTURAL_RATE, "normative": NORMATIVE_RATE}
+    control = RateController(rates, acceptance_ratio) if adaptive else None
+    if control is not None and known is not None and known["operators"]:
+        control.quality.update(known["operators"])
+    origins = [None] * pop_size # adaptive mode: (operators used, parents' fitness) per child
 
-        # if solved then it'll end here
-        if best_fit == 0:
-            return best_grid, 0, time.time()-start, gen
+    # shared memory worker pool, only for workers > 1
+    scorer = None
+    if workers is not None and workers > 1:
+        from src.parallel import SharedPopulationScorer # parallel.py imports this module
+        scorer = SharedPopulationScorer(cages, n, fitness_fn, pop_size, workers, repair_fn)
 
-        # update situational knowledge ( best solution ever )
-        if situational is None:
-            situational = list(best_indiv)
-        else:
-            old_fit = evaluate_fitness(
-                repair_latin(build_grid(situational, cages, n), n),
-                cages, n
-            )
-            if best_fit < old_fit:
+    # main generation loop
+    try:
+        for gen in range(generations):
+
+            if should_stop(): #to check if user pressed force stop in gui
+                break
+            if deadline is not None and time.time() >= deadline:
+                break
+
+            # does the main functions & then scores it based on cage/row/column violations
+            gen_seed = random.getrandbits(32)
+            if scorer is not None:
+                fits = scorer.score(population, gen_seed)
+                grid_of = scorer.grid
+            else:
+                fits, grids = score_population(population, cages, n, fitness_fn, gen_seed,
+                                               repair_fn)
+                grid_of = grids.__getitem__
+            scored = list(zip(fits, population))
+
+            k = min(range(pop_size), key=fits.__getitem__)
+            best_fit, best_indiv, best_grid = fits[k], population[k], grid_of(k)
+            if best_fit < best_ever[0]:
+                best_ever = (best_fit, best_grid)
+
+            # adaptive rates: credit last generation's operators, then measure diversity
+            restart = False
+            if control is not None:
+                for origin, fit in zip(origins, fits):
+                    if origin is not None:
+                        control.credit(origin[0], origin[1], fit)
+                restart = control.update(population_diversity(population, cage_domains))
+                rates = control.rates
+                acceptance_ratio = control.acceptance
+            if trace is not None:
+                row = control.snapshot() if control is not None else \
+                    dict(rates, acceptance=acceptance_ratio,
+                         diversity=population_diversity(population, cage_domains))
+                trace.append(dict(row, gen=gen, best=best_fit, restart=restart))
+
+            # --- GUI update ---
+            if gui_callback and gen % update_interval == 0:
+                gui_callback(best_grid, best_fit, gen)
+
+
+            # if solved then it'll end here
+            if best_fit == 0:
+                situational, situational_fit, situational_grid = list(best_indiv), 0, best_grid
+                return best_grid, 0, time.time()-start, gen
+
+            # update situational knowledge ( best solution ever )
+            if situational is None or best_fit < situational_fit:
                 situational = list(best_indiv)
-
-        # to count stagnation ( how many times the fitness is stuck in the same score)
-        if best_fit == prev_best:
-            stagnation += 1
-        else:
-            stagnation = 0
-        prev_best = best_fit
-
-        # add diversity to escape being stuck
-        if stagnation > 60:
-            for _ in range(pop_size//10):
-                population[random.randrange(pop_size)] = [
-                    random.choice(cage_domains[i]) for i in range(C)
-                ]
-            stagnation = 0
-
-        # selecting the best performing (lowest fitness) individuals
-        elite_count = max(2, int(pop_size * acceptance_ratio))
-        elites = [ind for (fit, ind, _) in scored[:elite_count]]
-
-        # updating normative values from elites
-        for i in range(C):
-            vals = {tuple(ind[i]) for ind in elites}
-            if len(vals) >= 2:
-                normative[i] = vals
-
-
-        # creating a new population
-
-        new_pop = []
-
-        while len(new_pop) < pop_size:
-
-            # choosing 3 parents
-            p1 = situational
-            p2 = random.choice(elites)
-            p3 = random.choice(elites)
-
-            child = []
-
-            # recombination (crossover) 
-            for i in range(C):
-                choice = random.random()
-                if choice < 0.33:
-                    child.append(p1[i])
-                elif choice < 0.66:
-                    child.append(p2[i])
-                else:
-                    child.append(p3[i])
-
-            # mutation 
-            for i in range(C):
-                if random.random() < mutation_rate:
-                    child[i] = random.choice(cage_domains[i])
-
-            # permutation mutation (to shuffle values inside a cage)
+                situational_fit = best_fit
+                situational_grid = best_grid
+
+            # to count stagnation ( how many times the fitness is stuck in the same score)
+            if best_fit == prev_best:
+                stagnation += 1
+            else:
+                stagnation = 0
+            prev_best = best_fit
+
+            # add diversity to escape being stuck (adaptive mode restarts on low diversity instead)
+            if control is None and stagnation > 60:
+                for _ in range(pop_size//10):
+                    population[random.randrange(pop_size)] = [
+                        random.choice(cage_domains[i]) for i in range(C)
+                    ]
+                stagnation = 0
+
+            # selecting the best performing (lowest fitness) individuals
+            elite_count = max(2, int(pop_size * acceptance_ratio))
+            elites, pick_parent = select(scored, elite_count)
+            if control is not None:
+                fit_of = {id(indiv): fit for fit, indiv in scored}
+
+            # updating normative values from elites
             for i in range(C):
-                if len(child[i]) > 1 and random.random() < 0.18:
-                    temp = list(child[i])
-                    random.shuffle(temp)
-                    child[i] = tuple(temp)
+                vals = {tuple(ind[i]) for ind in elites}
+                if len(vals) >= 2:
+                    normative[i] = vals
+
+
+            # creating a new population
+
+            new_pop = []
+            origins = []
+
+            while len(new_pop) < pop_size:
+
+                # choosing 3 parents
+                p1 = situational
+                p2 = pick_parent()
+                p3 = pick_parent()
+
+                child = []
+
+                # recombination (crossover) 
+                for i in range(C):
+                    choice = random.random()
+                    if choice < 0.33:
+                        child.append(p1[i])
+                    elif choice < 0.66:
+                        child.append(p2[i])
+                    else:
+                        child.append(p3[i])
+
+                # mutation 
+                used = set()
+                for i in range(C):
+                    if random.random() < rates["mutation"]:
+                        child[i] = random.choice(cage_domains[i])
+                        used.add("mutation")
+
+                # permutation mutation (to shuffle values inside a cage)
+                for i in range(C):
+                    if len(child[i]) > 1 and random.random() < rates["permutation"]:
+                        temp = list(child[i])
+                        random.shuffle(temp)
+                        child[i] = tuple(temp)
+                        used.add("permutation")
+
+                # structural swap mutation [explained that function at it's definition]
+                if random.random() < rates["structural"]:
+                    child = structural_swap(child, cages, n)
+                    used.add("structural")
+
+                # mutation using the normative knowledge (as said above, values of best performing)
+                for i in range(C):
+                    if random.random() < rates["normative"]:
+                        child[i] = random.choice(list(normative[i]))
+                        used.add("normative")
+
+                new_pop.append(child)
+                if control is not None:
+                    origins.append((used, (fit_of[id(p2)] + fit_of[id(p3)]) / 2))
+
+            # diversity collapsed: re-sample part of the new generation
+            if restart:
+                for k in random.sample(range(pop_size), int(pop_size * RESTART_FRACTION)):
+                    new_pop[k] = [random.choice(cage_domains[i]) for i in range(C)]
+                    origins[k] = None
+
+            population = new_pop
+            if control is None:
+                origins = [None] * pop_size
 
-            # structural swap mutation [explained that function at it's definition]
-            if random.random() < 0.10:
-                child = structural_swap(child, cages, n)
-
-            # mutation using the normative knowledge (as said above, values of best performing)
-            for i in range(C):
-                if random.random() < 0.10:
-                    child[i] = random.choice(list(normative[i]))
-
-            new_pop.append(child)
-
-        population = new_pop
+        else:
+            gen = generations
+    finally:
+        if scorer is not None:
+            scorer.close()
+        if beliefs is not None and situational is not None:
+            # the cage values of the repaired grid, not the genotype: repair can shuffle
+            # a cage into a tuple outside its domain, which a warm start would drop.
+            # a solved grid only holds valid combinations
+            best = [tuple(situational_grid[r][c] for r, c in cells) for cells, _, _ in cages]
+            best = [combo if combo in cage_domains[i] else situational[i]
+                    for i, combo in enumerate(best)]
+            # best combination first so it survives the store's per-cage cap
+            kept = [[best[i]] + [c for c in normative[i] if c != best[i]] for i in range(C)]
+            beliefs.record(cages, n, best, situational_fit, kept,
+                           control.quality if control is not None else None)
+            beliefs.save()
 
     # return the best solution (lowest fitness score) if no exact solution was found
-    best_fit, best_indiv, best_grid = min(scored, key=lambda x: x[0])
-    return best_grid, best_fit, time.time()-start, generations
+    best_fit, best_grid = best_ever
+    if best_grid is None: # stopped before the first generation was scored
+        best_grid = build_grid(population[0], cages, n)
+        best_fit = fitness_fn(best_grid, cages, n)
+    return best_grid, best_fit, time.time()-start, gen
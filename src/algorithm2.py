@@ -1,76 +1,95 @@
 # algorithm2.py - backtracking solver that has animation support.
 
+import random
 import time
+from collections import OrderedDict
 from copy import deepcopy
 
+from src.cages import partial_feasible
+from src.propagation import same_line, cage_domain, propagate, is_consistent
 
+DEADLINE_CHECK_MASK = 1023  # the clock is only read once every 1024 steps
+
+
+class SearchTimeout(Exception): # raised inside the search when the time budget runs out
+    pass
+
+
+class SearchRestart(Exception): # raised when a restart attempt used up its step budget
+    pass
+
+
+# share of filled cells in a board, 1.0 means a complete solution
+def fill_ratio(board):
+    if board is None:
+        return 0.0
+    n = len(board)
+    return sum(1 for row in board for v in row if v != 0) / (n * n)
+
+
+# partial cage check, backed by the feasibility tables in cages.py
 def cage_valid_partial(board, cage, n): #check function for checking cage valid or not
     cells, target, op = cage
-    vals = []
-    unfilled = 0
+    assigned = []
+    open_cells = []
 
     for (r, c) in cells:
         if board[r][c] == 0:
-            unfilled += 1
-        vals.append(board[r][c])
+            open_cells.append((r, c))
+        else:
+            assigned.append(board[r][c])
 
-    assigned = [v for v in vals if v != 0]
+    return partial_feasible(op, target, assigned, tuple(open_cells), n)
 
-    if op == '=' or op == '':
-        if len(assigned) == 0:
-            return True
-        return assigned[0] == target
 
-    if op == '+':
-        s = sum(assigned)
-        if s > target:
-            return False
-        if unfilled == 0 and s != target:
-            return False
+# checked every DEADLINE_CHECK_MASK+1 steps: the time budget ran out, or the caller
+# (should_stop, e.g. a client that went away) wants the search to end
+def out_of_time(deadline, should_stop):
+    if deadline is not None and time.time() >= deadline:
         return True
+    return should_stop is not None and should_stop()
 
-    if op == '*':
-        prod = 1
-        for v in assigned:
-            prod *= v
-        if prod > target:
-            return False
-        if unfilled == 0 and prod != target:
-            return False
-        return True
-
-    if op == '-':
-        if len(assigned) < 2:
-            return True
-        a, b = assigned
-        return abs(a - b) == target
-
-    if op == '/':
-        if len(assigned) < 2:
-            return True
-        a, b = assigned
-        if min(a, b) == 0:
-            return False
-        return max(a, b) / min(a, b) == target
 
-    return True
+# values to try for every cell, sorted; all of 1..n without propagation.
+# None when propagation already shows the puzzle has no solution
+def candidate_values(cages, n, use_propagation=True):
+    if not use_propagation:
+        return [[list(range(1, n+1)) for _ in range(n)] for _ in range(n)]
+    cell_domains, cage_domains = propagate(cages, n)
+    if not is_consistent(cell_domains, cage_domains):
+        return None
+    return [[sorted(d) for d in row] for row in cell_domains]
 
 
-def backtracking_solve(cages, n): # backtracking solve loop
+# backtracking solve loop
+# with a time_limit (seconds) the search stops when it runs out and returns the
+# deepest consistent partial board reached so far (empty cells are 0, see fill_ratio).
+# should_stop() ends it the same way; it is polled with the clock
+def backtracking_solve(cages, n, time_limit=None, use_propagation=True, should_stop=None):
 
     board = [[0]*n for _ in range(n)]
     cells = [(r, c) for r in range(n) for c in range(n)]
     steps = 0
     start = time.time()
+    values = candidate_values(cages, n, use_propagation)
+    if values is None:
+        return None, steps, (time.time() - start)
+    deadline = start + time_limit if time_limit is not None else None
+    limited = deadline is not None or should_stop is not None
+    deepest = [0, deepcopy(board)]
 
     def solve_cell(idx): #inner recursive function
         nonlocal steps
         if idx == n*n:
             return True
 
+        if limited and idx > deepest[0]:
+            deepest[0] = idx
+            deepest[1] = deepcopy(board)
+
         r, c = cells[idx]
 
-        for v in range(1, n+1):
+        for v in values[r][c]:
             if v in board[r]:
                 continue
             if any(board[x][c] == v for x in range(n)):
@@ -78,6 +97,8 @@ def backtracking_solve(cages, n): # backtracking solve loop
 
             board[r][c] = v
             steps += 1
+            if limited and steps & DEADLINE_CHECK_MASK == 0 and out_of_time(deadline, should_stop):
+                raise SearchTimeout
 
             ok = True
             for cage in cages:
@@ -93,7 +114,10 @@ def backtracking_solve(cages, n): # backtracking solve loop
 
         return False
 
-    solved = solve_cell(0)
+    try:
+        solved = solve_cell(0)
+    except SearchTimeout:
+        return deepest[1], steps, (time.time() - start)
     end = time.time()
 
     if solved:
@@ -102,13 +126,16 @@ def backtracking_solve(cages, n): # backtracking solve loop
         return None, steps, (end - start)
 
 
-class AnimatedBacktrackingSolver: #animated backtracking same function but records steps
-    def __init__(self, cages, n):
+class AnimatedBacktrackingSolver: #animated backtracking same function but records (or streams) steps
+    def __init__(self, cages, n, time_limit=None, use_propagation=True):
         self.cages = cages
         self.n = n
+        self.values = candidate_values(cages, n, use_propagation)
         self.board = [[0]*n for _ in range(n)]
         self.steps = 0
         self.actions = []  
+        self.deadline = time.time() + time_limit if time_limit is not None else None
+        self.deepest = (0, deepcopy(self.board)) # deepest partial board, kept when a deadline is set
 
     def row_ok(self, r, v):
         return v not in self.board[r]
@@ -123,14 +150,22 @@ class AnimatedBacktrackingSolver: #animated backtracking same function but recor
                     return False
         return True
 
-    def solve(self, idx=0):
+    # the search as a generator: yields (r, c, value, is_trial) while it runs, so the
+    # caller can show each step straight away instead of waiting for the whole search.
+    # the generator's return value says whether the board got solved
+    def iter_actions(self, idx=0):
+        if self.values is None: # propagation found a contradiction
+            return False
         if idx == self.n * self.n:
             return True
 
+        if self.deadline is not None and idx > self.deepest[0]:
+            self.deepest = (idx, deepcopy(self.board))
+
         r = idx // self.n
         c = idx % self.n
 
-        for v in range(1, self.n+1):
+        for v in self.values[r][c]:
             if not self.row_ok(r, v):
                 continue
             if not self.col_ok(c, v):
@@ -138,25 +173,512 @@ class AnimatedBacktrackingSolver: #animated backtracking same function but recor
 
             self.board[r][c] = v
             self.steps += 1
-            self.actions.append((r, c, v, True))
+            if self.deadline is not None and self.steps & DEADLINE_CHECK_MASK == 0 \
+                    and time.time() >= self.deadline:
+                raise SearchTimeout
+            yield (r, c, v, True)
 
             if not self.cage_ok(r, c):
                 self.board[r][c] = 0
-                self.actions.append((r, c, 0, False))
+                yield (r, c, 0, False)
                 continue
 
-            if self.solve(idx + 1):
+            if (yield from self.iter_actions(idx + 1)):
                 return True
 
             self.board[r][c] = 0
-            self.actions.append((r, c, 0, False))
+            yield (r, c, 0, False)
 
         return False
 
+    # runs the whole search and records every action in self.actions
+    def solve(self, idx=0):
+        search = self.iter_actions(idx)
+        while True:
+            try:
+                self.actions.append(next(search))
+            except StopIteration as done:
+                return done.value
+
 
-def compute_animation_sequence(cages, n):
-    solver = AnimatedBacktrackingSolver(cages, n)
+def compute_animation_sequence(cages, n, time_limit=None, use_propagation=True):
+    solver = AnimatedBacktrackingSolver(cages, n, time_limit, use_propagation)
     start = time.time()
-    solver.solve()
+    try:
+        solver.solve()
+        board = solver.board
+    except SearchTimeout:
+        board = solver.deepest[1]
     end = time.time()
-    return deepcopy(solver.board), solver.steps, (end - start), solver.actions[:]
+    return deepcopy(board), solver.steps, (end - start), solver.actions[:]
+
+
+
+# ---------------------------------------------------------------------------
+# cage-level backtracking: a whole cage combination is placed in one step
+
+# for every pair of cages sharing a row or column: compat[i][j][a] is a bitset over the
+# combinations of cage j that can sit next to combination a of cage i
+def build_compatibility(cages, domains):
+    C = len(cages)
+    compat = [dict() for _ in range(C)]
+    for i in range(C):
+        cells_i = cages[i][0]
+        for j in range(i+1, C):
+            cells_j = cages[j][0]
+            pairs = [(p, q) for p, a in enumerate(cells_i) for q, b in enumerate(cells_j)
+                     if same_line(a, b)]
+            if not pairs:
+                continue
+            fwd = []
+            back = [0] * len(domains[j])
+            for a, ca in enumerate(domains[i]):
+                mask = 0
+                for b, cb in enumerate(domains[j]):
+                    if all(ca[p] != cb[q] for p, q in pairs):
+                        mask |= 1 << b
+                        back[b] |= 1 << a
+                fwd.append(mask)
+            compat[i][j] = fwd
+            compat[j][i] = back
+    return compat
+
+
+# backtracking over cages instead of cells, the next cage is always the one with the
+# fewest combinations left that fit with everything placed so far.
+# returns (board, steps, time) like backtracking_solve, time_limit works the same way
+def cage_backtracking_solve(cages, n, time_limit=None, domains=None, use_propagation=True,
+                            should_stop=None):
+    start = time.time()
+    deadline = start + time_limit if time_limit is not None else None
+    limited = deadline is not None or should_stop is not None
+
+    if domains is None:
+        if use_propagation:
+            _, domains = propagate(cages, n)
+        else:
+            domains = [cage_domain(cells, target, op, n) for cells, target, op in cages]
+    compat = build_compatibility(cages, domains)
+
+    C = len(cages)
+    live = [(1 << len(d)) - 1 for d in domains]
+    chosen = [None] * C
+    steps = 0
+    deepest = [-1, None]
+
+    def board_of():
+        board = [[0]*n for _ in range(n)]
+        for (cells, _, _), combo in zip(cages, chosen):
+            if combo is not None:
+                for (r, c), v in zip(cells, combo):
+                    board[r][c] = v
+        return board
+
+    def search(depth):
+        nonlocal steps
+        if depth == C:
+            return True
+
+        if limited and depth > deepest[0]:
+            deepest[0] = depth
+            deepest[1] = board_of()
+
+        # most constrained cage first
+        best = -1
+        best_count = 1 << 30
+        for i in range(C):
+            if chosen[i] is None:
+                cnt = live[i].bit_count()
+                if cnt < best_count:
+                    best, best_count = i, cnt
+                    if cnt <= 1:
+                        break
+        if best_count == 0:
+            return False
+
+        i = best
+        mask = live[i]
+        neigh = [(j, m) for j, m in compat[i].items() if chosen[j] is None]
+        while mask:
+            low = mask & -mask
+            a = low.bit_length() - 1
+            mask ^= low
+
+            steps += 1
+            if limited and steps & DEADLINE_CHECK_MASK == 0 and out_of_time(deadline, should_stop):
+                raise SearchTimeout
+
+            saved = []
+            ok = True
+            for j, m in neigh:
+                nl = live[j] & m[a]
+                saved.append((j, live[j]))
+                live[j] = nl
+                if not nl:
+                    ok = False
+                    break
+
+            if ok:
+                chosen[i] = domains[i][a]
+                if search(depth + 1):
+                    return True
+                chosen[i] = None
+
+            for j, old in saved:
+                live[j] = old
+
+        return False
+
+    try:
+        solved = search(0)
+    except SearchTimeout:
+        return deepest[1], steps, (time.time() - start)
+
+    if solved:
+        return board_of(), steps, (time.time() - start)
+    return None, steps, (time.time() - start)
+
+
+# number of solutions, counting stops at `limit` (limit=2 answers "is it unique?").
+# same cage search as above, it just keeps going after the first solution
+def count_solutions(cages, n, domains=None, limit=2, use_propagation=True):
+    if domains is None:
+        if use_propagation:
+            _, domains = propagate(cages, n)
+        else:
+            domains = [cage_domain(cells, target, op, n) for cells, target, op in cages]
+    if not all(domains):
+        return 0
+    compat = build_compatibility(cages, domains)
+
+    C = len(cages)
+    live = [(1 << len(d)) - 1 for d in domains]
+    placed = [False] * C
+    found = 0
+
+    def search(depth):
+        nonlocal found
+        if depth == C:
+            found += 1
+            return found >= limit
+
+        best = min((i for i in range(C) if not placed[i]), key=lambda i: live[i].bit_count())
+        mask = live[best]
+        neigh = [(j, m) for j, m in compat[best].items() if not placed[j]]
+        placed[best] = True
+        while mask:
+            low = mask & -mask
+            a = low.bit_length() - 1
+            mask ^= low
+
+            saved = []
+            ok = True
+            for j, m in neigh:
+                saved.append((j, live[j]))
+                live[j] &= m[a]
+                if not live[j]:
+                    ok = False
+                    break
+            done = ok and search(depth + 1)
+            for j, old in saved:
+                live[j] = old
+            if done:
+                return True
+        placed[best] = False
+        return False
+
+    search(0)
+    return found
+
+
+# ---------------------------------------------------------------------------
+# randomized backtracking with restarts
+
+# i-th term (from 1) of the Luby sequence 1 1 2 1 1 2 4 1 1 2 1 1 2 4 8 ...
+def luby(i):
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if i == (1 << k) - 1:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+# cell-level search that restarts from scratch whenever an attempt uses up its step budget.
+# budgets follow base_steps * luby(attempt); value order is shuffled with `seed` and the next
+# cell is the one with fewest candidates, ties going to cells that failed most in earlier
+# attempts. failure counts survive restarts. pass a dict as `stats` to get restarts/failures.
+# returns (board, steps, time) like backtracking_solve
+def restart_backtracking_solve(cages, n, seed=None, time_limit=None, base_steps=300,
+                               use_propagation=True, stats=None, should_stop=None):
+    rng = random.Random(seed)
+    start = time.time()
+    deadline = start + time_limit if time_limit is not None else None
+    limited = deadline is not None or should_stop is not None
+
+    values = candidate_values(cages, n, use_propagation)
+    if values is None:
+        return None, 0, (time.time() - start)
+
+    cage_of = {}
+    for cage in cages:
+        for cell in cage[0]:
+            cage_of[cell] = cage
+
+    board = [[0]*n for _ in range(n)]
+    row_used = [set() for _ in range(n)]
+    col_used = [set() for _ in range(n)]
+    failures = [[0]*n for _ in range(n)]
+    free = {(r, c) for r in range(n) for c in range(n)}
+    steps = 0
+    budget = 0
+    deepest = [-1, None]
+
+    def legal(r, c):
+        out = []
+        cage = cage_of[(r, c)]
+        for v in values[r][c]:
+            if v in row_used[r] or v in col_used[c]:
+                continue
+            board[r][c] = v
+            if cage_valid_partial(board, cage, n):
+                out.append(v)
+        board[r][c] = 0
+        return out
+
+    def search(depth):
+        nonlocal steps
+        if not free:
+            return True
+        if limited and depth > deepest[0]:
+            deepest[0] = depth
+            deepest[1] = deepcopy(board)
+
+        # fewest candidates first, most earlier failures next, random among the rest
+        best = None
+        best_key = None
+        for (r, c) in free:
+            key = (len(legal(r, c)), -failures[r][c], rng.random())
+            if best_key is None or key < best_key:
+                best, best_key = (r, c), key
+        r, c = best
+
+        opts = legal(r, c)
+        rng.shuffle(opts)
+        free.discard(best)
+        for v in opts:
+            steps += 1
+            if steps >= budget:
+                raise SearchRestart
+            if limited and steps & DEADLINE_CHECK_MASK == 0 and out_of_time(deadline, should_stop):
+                raise SearchTimeout
+
+            board[r][c] = v
+            row_used[r].add(v)
+            col_used[c].add(v)
+            if search(depth + 1):
+                return True
+            row_used[r].discard(v)
+            col_used[c].discard(v)
+            board[r][c] = 0
+
+        free.add(best)
+        failures[r][c] += 1
+        return False
+
+    attempt = 0
+    solved = False
+    timed_out = False
+    try:
+        while True:
+            attempt += 1
+            budget = steps + base_steps * luby(attempt)
+            board = [[0]*n for _ in range(n)]
+            row_used = [set() for _ in range(n)]
+            col_used = [set() for _ in range(n)]
+            free = {(r, c) for r in range(n) for c in range(n)}
+            try:
+                solved = search(0) # an attempt that finishes within budget is a complete search
+                break
+            except SearchRestart:
+                continue
+    except SearchTimeout:
+        timed_out = True
+
+    if stats is not None:
+        stats["restarts"] = attempt - 1
+        stats["failures"] = failures
+
+    if timed_out:
+        return deepest[1], steps, (time.time() - start)
+    if solved:
+        return deepcopy(board), steps, (time.time() - start)
+    return None, steps, (time.time() - start)
+
+
+# ---------------------------------------------------------------------------
+# conflict-directed backjumping with nogood recording
+
+# bounded table of nogoods: sets of assignments that cannot all hold together.
+# an assignment is one bit of an int (see backjumping_solve), so a nogood is a bitmask
+# and checking it against the board is a single AND. each nogood is filed under its last
+# assignment in search order and only looked at when that assignment is made.
+# the oldest entries are dropped when the table is full
+class NogoodTable:
+    def __init__(self, limit=5000, max_size=8):
+        self.limit = limit
+        self.max_size = max_size # longer nogoods are rarely hit again, so they are not kept
+        self.index = {}  # bit of the last assignment -> set of masks of the other assignments
+        self.order = OrderedDict()
+        self.hits = 0
+
+    def __len__(self):
+        return len(self.order)
+
+    def add(self, key, rest, size):
+        if size > self.max_size or self.limit <= 0:
+            return
+        entry = (key, rest)
+        if entry in self.order:
+            self.order.move_to_end(entry)
+            return
+        self.order[entry] = None
+        self.index.setdefault(key, set()).add(rest)
+        if len(self.order) > self.limit:
+            old_key, old_rest = self.order.popitem(last=False)[0]
+            bucket = self.index[old_key]
+            bucket.discard(old_rest)
+            if not bucket:
+                del self.index[old_key]
+
+    # mask of the other assignments of a nogood completed by `key`, or None
+    def violated(self, key, assigned):
+        bucket = self.index.get(key)
+        if bucket:
+            for rest in bucket:
+                if rest & assigned == rest:
+                    self.hits += 1
+                    return rest
+        return None
+
+
+# cell-level search in row-major order like backtracking_solve, but every failed value
+# remembers which earlier cells caused it (same row/column value, cage partners, nogood).
+# when a cell runs out of values the search jumps straight back to the deepest of those
+# cells and the culprit assignments are stored as a nogood.
+# returns (board, steps, time) like backtracking_solve; pass a dict as `stats` for
+# jumps, skipped levels, nogoods stored and nogood hits
+def backjumping_solve(cages, n, time_limit=None, use_propagation=True,
+                      nogood_limit=5000, stats=None, should_stop=None):
+    start = time.time()
+    deadline = start + time_limit if time_limit is not None else None
+    limited = deadline is not None or should_stop is not None
+
+    values = candidate_values(cages, n, use_propagation)
+    if values is None:
+        return None, 0, (time.time() - start)
+
+    # depth i is cell (i // n, i % n); "cell i holds v" is bit i*n + v-1 of `assigned`
+    cells = [(r, c) for r in range(n) for c in range(n)]
+    cage_of = {}
+    for cage in cages:
+        for cell in cage[0]:
+            cage_of[cell] = cage
+
+    board = [[0]*n for _ in range(n)]
+    row_pos = [[-1]*(n+1) for _ in range(n)]  # row_pos[r][v]: depth of the cell holding v in row r
+    col_pos = [[-1]*(n+1) for _ in range(n)]
+    assigned = 0
+    nogoods = NogoodTable(nogood_limit)
+    steps = 0
+    jumps = 0
+    skipped = 0
+    deepest = [-1, None]
+    SOLVED = None
+
+    def search(i):
+        nonlocal steps, jumps, skipped, assigned
+        if i == n*n:
+            return SOLVED
+        if limited and i > deepest[0]:
+            deepest[0] = i
+            deepest[1] = deepcopy(board)
+
+        r, c = cell = cells[i]
+        cage = cage_of[cell]
+        conf = set()
+
+        for v in values[r][c]:
+            if row_pos[r][v] >= 0:
+                conf.add(row_pos[r][v])
+                continue
+            if col_pos[c][v] >= 0:
+                conf.add(col_pos[c][v])
+                continue
+
+            steps += 1
+            if limited and steps & DEADLINE_CHECK_MASK == 0 and out_of_time(deadline, should_stop):
+                raise SearchTimeout
+
+            bit = 1 << (i*n + v - 1)
+            rest = nogoods.violated(bit, assigned)
+            if rest is not None:
+                while rest:
+                    low = rest & -rest
+                    conf.add((low.bit_length() - 1) // n)
+                    rest ^= low
+                continue
+
+            board[r][c] = v
+            if not cage_valid_partial(board, cage, n):
+                board[r][c] = 0
+                conf.update(x[0]*n + x[1] for x in cage[0] if board[x[0]][x[1]] != 0)
+                continue
+
+            row_pos[r][v] = i
+            col_pos[c][v] = i
+            assigned |= bit
+            res = search(i + 1)
+            if res is SOLVED:
+                return SOLVED
+            assigned ^= bit
+            row_pos[r][v] = -1
+            col_pos[c][v] = -1
+            board[r][c] = 0
+
+            if i not in res: # this cell played no part in the failure below, keep jumping
+                return res
+            conf |= res
+            conf.discard(i)
+
+        # dead end: jump back to the deepest culprit, nothing in between can fix it
+        if conf:
+            h = max(conf)
+            if h < i - 1:
+                jumps += 1
+                skipped += i - 1 - h
+            mask = 0
+            for d in conf:
+                mask |= 1 << (d*n + board[d // n][d % n] - 1)
+            key = 1 << (h*n + board[h // n][h % n] - 1)
+            nogoods.add(key, mask ^ key, len(conf))
+        return conf
+
+    solved = False
+    try:
+        solved = search(0) is SOLVED
+    except SearchTimeout:
+        board = deepest[1]
+        solved = None
+
+    if stats is not None:
+        stats["jumps"] = jumps
+        stats["skipped_levels"] = skipped
+        stats["nogoods"] = len(nogoods)
+        stats["nogood_hits"] = nogoods.hits
+
+    if solved is None:
+        return board, steps, (time.time() - start)
+    if solved:
+        return deepcopy(board), steps, (time.time() - start)
+    return None, steps, (time.time() - start)
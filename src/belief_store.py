@@ -0,0 +1,171 @@
+# belief_store.py - the CA's belief space kept between runs
+#
+# two tables in one json file:
+#   puzzles:    puzzle hash -> best individual, its fitness, normative sets per cage and
+#               (adaptive runs) operator success rates
+#   signatures: cage signature (n, shape, target, op) -> combinations the elites used
+#
+# a repeat puzzle gets everything back; a new puzzle still gets the normative sets of
+# every cage whose signature was seen before, wherever it sits on the board.
+# entries older than max_age days go first, then the oldest ones beyond max_entries.
+#
+#   cultural_algorithm(cages, n, beliefs="saved results/beliefs.json")
+
+import json
+import os
+import time
+
+from src.utils import puzzle_hash
+
+DEFAULT_BELIEFS = os.path.join("saved results", "beliefs.json")
+MAX_ENTRIES = 500
+MAX_AGE_DAYS = 30
+MAX_COMBOS = 32  # normative combinations kept per cage
+FORMAT = 2  # puzzle entries are stored in canonical cage/cell order since format 2
+
+
+# cells of a cage sorted and moved to the origin, plus the order that maps cage cell
+# order to that sorted order, so one shape matches wherever it is on the board
+def _shape(cells):
+    order = sorted(range(len(cells)), key=lambda p: cells[p])
+    r0 = min(r for r, _ in cells)
+    c0 = min(c for _, c in cells)
+    return tuple((cells[p][0] - r0, cells[p][1] - c0) for p in order), order
+
+
+# puzzle_hash ignores the order of cages and of cells in a cage, so puzzle entries are kept
+# in a canonical order: cages sorted by their cells, each cage's values in sorted cell order.
+# returns that cage order and, per cage, the cell order from _shape
+def _canonical(cages):
+    order = sorted(range(len(cages)),
+                   key=lambda i: (sorted(tuple(cell) for cell in cages[i][0]), cages[i][1], cages[i][2]))
+    return order, [_shape(cells)[1] for cells, _, _ in cages]
+
+
+def _to_canonical(cages, per_cage):
+    order, shapes = _canonical(cages)
+    return [[[combo[p] for p in shapes[i]] for combo in per_cage[i]] for i in order]
+
+
+def _from_canonical(cages, stored):
+    order, shapes = _canonical(cages)
+    per_cage = [None] * len(cages)
+    for j, i in enumerate(order):
+        combos = []
+        for sorted_combo in stored[j]:
+            combo = [0] * len(shapes[i])
+            for k, p in enumerate(shapes[i]):
+                combo[p] = sorted_combo[k]
+            combos.append(tuple(combo))
+        per_cage[i] = combos
+    return per_cage
+
+
+def cage_signature(cells, target, op, n):
+    shape, _ = _shape(cells)
+    return json.dumps([n, shape, target, op])
+
+
+class BeliefStore:
+    def __init__(self, path=DEFAULT_BELIEFS, max_entries=MAX_ENTRIES, max_age_days=MAX_AGE_DAYS):
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+        self.puzzles = {}
+        self.signatures = {}
+        if path and os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                # older puzzle entries are in the order of the run that wrote them
+                if data.get("format") == FORMAT:
+                    self.puzzles = data.get("puzzles", {})
+                self.signatures = data.get("signatures", {})
+            except (OSError, ValueError):
+                pass # unreadable store, start empty
+
+    # what is known about this puzzle, all fields empty/None when nothing matches:
+    #   best       - best individual (one combination per cage) of an earlier run
+    #   best_fit   - its fitness
+    #   normative  - per cage, a list of combinations or None
+    #   operators  - operator success rates of an earlier adaptive run
+    def lookup(self, cages, n):
+        entry = self.puzzles.get(puzzle_hash(cages, n))
+        if entry is not None and len(entry["best"]) != len(cages):
+            entry = None
+        normative = []
+        for cells, target, op in cages:
+            sig = self.signatures.get(cage_signature(cells, target, op, n))
+            if sig is None:
+                normative.append(None)
+                continue
+            _, order = _shape(cells)
+            combos = []
+            for sorted_combo in sig["combos"]:
+                combo = [0] * len(cells)
+                for k, p in enumerate(order):
+                    combo[p] = sorted_combo[k]
+                combos.append(tuple(combo))
+            normative.append(combos)
+
+        best = None
+        if entry is not None:
+            # the puzzle's own sets are more specific than the shared signature ones
+            own = _from_canonical(cages, entry["normative"])
+            normative = [combos if combos else shared for combos, shared in zip(own, normative)]
+            best = [combos[0] for combos in _from_canonical(cages, [[c] for c in entry["best"]])]
+        return {
+            "best": best,
+            "best_fit": entry["best_fit"] if entry else None,
+            "normative": normative,
+            "operators": entry.get("operators") if entry else None,
+        }
+
+    # remember the outcome of a run; normative is one collection of combinations per cage
+    def record(self, cages, n, best, best_fit, normative, operators=None):
+        now = time.time()
+        key = puzzle_hash(cages, n)
+        old = self.puzzles.get(key)
+        if old is None or old["best_fit"] is None or best_fit <= old["best_fit"]:
+            kept_best = [combos[0] for combos in _to_canonical(cages, [[c] for c in best])]
+            kept_fit = best_fit
+        else:
+            kept_best, kept_fit = old["best"], old["best_fit"]
+        self.puzzles[key] = {
+            "ts": now,
+            "n": n,
+            "best": kept_best,
+            "best_fit": kept_fit,
+            "normative": _to_canonical(cages, [list(combos)[:MAX_COMBOS] for combos in normative]),
+            "operators": operators if operators is not None else (old or {}).get("operators"),
+        }
+
+        for (cells, target, op), combos in zip(cages, normative):
+            _, order = _shape(cells)
+            sig = cage_signature(cells, target, op, n)
+            merged = [[c[p] for p in order] for c in combos]
+            if sig in self.signatures:
+                merged += [c for c in self.signatures[sig]["combos"] if c not in merged]
+            self.signatures[sig] = {"ts": now, "combos": merged[:MAX_COMBOS]}
+
+        self.evict(now)
+
+    def evict(self, now=None):
+        now = now or time.time()
+        for table in (self.puzzles, self.signatures):
+            for key in [k for k, v in table.items() if now - v["ts"] > self.max_age]:
+                del table[key]
+            if len(table) > self.max_entries:
+                newest = sorted(table, key=lambda k: table[k]["ts"], reverse=True)
+                for key in newest[self.max_entries:]:
+                    del table[key]
+
+    def save(self):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"format": FORMAT, "puzzles": self.puzzles,
+                       "signatures": self.signatures}, f)
+        os.replace(tmp, self.path) # readers never see a half-written file
@@ -0,0 +1,173 @@
+# benchmark.py - batch runs of the solvers over utils.PUZZLES
+#
+# results go to the append-only results store, then summarise them with
+#   python -m src.benchmark --solvers ca,bt --repeats 3
+#   python -m src.results_store summary "saved results/runs.jsonl"
+
+import argparse
+import ast
+
+from src.utils import PUZZLES, puzzle_size
+from src.algorithm1 import (
+    FITNESS_FUNCTIONS, REPAIR_FUNCTIONS, SELECTION_STRATEGIES, cultural_algorithm,
+)
+from src.permutation_ca import permutation_cultural_algorithm
+from src.algorithm2 import (
+    backjumping_solve, backtracking_solve, cage_backtracking_solve, restart_backtracking_solve,
+)
+from src.results_store import DEFAULT_PATH, ResultsStore, aggregate, make_record, print_summary
+
+
+# every runner returns the keyword fields of results_store.make_record
+def run_ca(cages, n, seed=None, time_limit=None, **params):
+    grid, fit, t, gens = cultural_algorithm(cages, n, time_limit=time_limit, seed=seed, **params)
+    return dict(time_taken=t, solution=grid, fitness=fit, generations=gens, params=params)
+
+
+def run_perm_ca(cages, n, seed=None, time_limit=None, **params):
+    grid, fit, t, gens = permutation_cultural_algorithm(cages, n, time_limit=time_limit, seed=seed,
+                                                        **params)
+    return dict(time_taken=t, solution=grid, fitness=fit, generations=gens, params=params)
+
+
+def run_bt(cages, n, seed=None, time_limit=None, **params):
+    board, steps, t = backtracking_solve(cages, n, time_limit=time_limit, **params)
+    return dict(time_taken=t, solution=board, steps=steps, params=params)
+
+
+def run_cage_bt(cages, n, seed=None, time_limit=None, **params):
+    board, steps, t = cage_backtracking_solve(cages, n, time_limit=time_limit, **params)
+    return dict(time_taken=t, solution=board, steps=steps, params=params)
+
+
+def run_restart_bt(cages, n, seed=None, time_limit=None, **params):
+    board, steps, t = restart_backtracking_solve(cages, n, seed=seed, time_limit=time_limit, **params)
+    return dict(time_taken=t, solution=board, steps=steps, params=params)
+
+
+def run_cbj_bt(cages, n, seed=None, time_limit=None, **params):
+    board, steps, t = backjumping_solve(cages, n, time_limit=time_limit, **params)
+    return dict(time_taken=t, solution=board, steps=steps, params=params)
+
+
+SOLVERS = {
+    "ca": run_ca,
+    "perm_ca": run_perm_ca,
+    "bt": run_bt,
+    "cage_bt": run_cage_bt,
+    "restart_bt": run_restart_bt,
+    "cbj_bt": run_cbj_bt,
+}
+
+
+# named groups of variants to compare: label -> (solver, params)
+def ca_strategy_variants():
+    return {f"ca:{fit}/{sel}": ("ca", {"fitness": fit, "selection": sel})
+            for fit in FITNESS_FUNCTIONS for sel in SELECTION_STRATEGIES}
+
+
+def ca_adaptive_variants():
+    return {"ca:fixed": ("ca", {}), "ca:adaptive": ("ca", {"adaptive": True})}
+
+
+def ca_repair_variants():
+    return {f"ca:{name}-repair": ("ca", {"repair": name}) for name in REPAIR_FUNCTIONS}
+
+
+VARIANT_SETS = {
+    "ca-strategies": ca_strategy_variants,
+    "ca-adaptive": ca_adaptive_variants,
+    "ca-repair": ca_repair_variants,
+}
+
+
+def select_puzzles(pattern=None):
+    return {name: cages for name, cages in PUZZLES.items()
+            if pattern is None or pattern.lower() in name.lower()}
+
+
+# run every solver `repeats` times on every puzzle and log each run.
+# `solvers` is a list of SOLVERS names or a dict of variants label -> (solver, params);
+# `params` maps solver names to parameters shared by all of their variants
+def run_benchmark(solvers, puzzles, repeats=1, store=None, time_limit=None, seed=0,
+                  params=None, verbose=True):
+    if not isinstance(solvers, dict):
+        solvers = {s: (s, {}) for s in solvers}
+    records = []
+    for name, cages in puzzles.items():
+        n = puzzle_size(cages)
+        for label, (solver, variant_params) in solvers.items():
+            runner = SOLVERS[solver]
+            run_params = dict((params or {}).get(solver, {}), **variant_params)
+            for rep in range(repeats):
+                run_seed = None if seed is None else seed + rep
+                out = runner(cages, n, seed=run_seed, time_limit=time_limit, **run_params)
+                rec = make_record(cages, n, label, seed=run_seed, puzzle_name=name, **out)
+                records.append(rec)
+                if store is not None:
+                    store.append(rec)
+                if verbose:
+                    extra = rec["steps"] if rec["steps"] is not None else rec["generations"]
+                    print(f"{name:>22}  {label:>6}  #{rep}  {rec['time']:9.4f}s  "
+                          f"{'solved' if rec['solved'] else 'unsolved':>8}  {extra}")
+    return records
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Benchmark the KenKen solvers")
+    ap.add_argument("--solvers", default="ca,bt", help=f"comma separated, from {sorted(SOLVERS)}")
+    ap.add_argument("--puzzles", help="only puzzles whose name contains this text")
+    ap.add_argument("--repeats", type=int, default=1)
+    ap.add_argument("--time-limit", type=float, default=None, help="seconds per run")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", default=DEFAULT_PATH, help="results store to append to")
+    ap.add_argument("--no-store", action="store_true", help="do not write the results store")
+    ap.add_argument("--no-propagation", action="store_true",
+                    help="run the solvers without the constraint propagation stage")
+    ap.add_argument("--variants", choices=sorted(VARIANT_SETS),
+                    help="compare a named group of solver variants instead of --solvers")
+    ap.add_argument("--set", action="append", default=[], metavar="SOLVER.KEY=VALUE",
+                    help="solver parameter, e.g. --set ca.selection=tournament (repeatable)")
+    args = ap.parse_args(argv)
+
+    if args.variants:
+        variants = VARIANT_SETS[args.variants]()
+        solvers = sorted({solver for solver, _ in variants.values()})
+    else:
+        solvers = variants = args.solvers.split(",")
+    for s in solvers:
+        if s not in SOLVERS:
+            ap.error(f"unknown solver {s!r}")
+    params = {s: {} for s in solvers}
+    if args.no_propagation:
+        for s in solvers:
+            params[s]["use_propagation"] = False
+    for item in args.set:
+        name, _, value = item.partition("=")
+        solver, _, key = name.partition(".")
+        if solver not in params or not key:
+            ap.error(f"bad --set {item!r}")
+        try:
+            params[solver][key] = ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            params[solver][key] = value
+
+    store = None if args.no_store else ResultsStore(args.out)
+    try:
+        records = run_benchmark(variants, select_puzzles(args.puzzles), args.repeats,
+                                store, args.time_limit, args.seed, params)
+    finally:
+        if store is not None:
+            store.close()
+
+    print()
+    print_summary(aggregate(records, by=("solver", "n")), "time")
+    for field in ("generations", "steps"):
+        rows = aggregate(records, by=("solver", "n"), field=field)
+        if rows:
+            print()
+            print_summary(rows, field)
+
+
+if __name__ == "__main__":
+    main()
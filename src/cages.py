@@ -0,0 +1,187 @@
+# cages.py - cage arithmetic shared by all solvers
+
+from collections import Counter
+from functools import lru_cache
+from itertools import combinations
+
+COMBINATION_CACHE = 4096  # (size, target, op, n) tables kept in memory
+
+
+# check if cage is satisfied by certain given values
+def cage_valid(values, target, op):
+    if op == '+':
+        return sum(values) == target
+    if op == '-':
+        return len(values) == 2 and abs(values[0] - values[1]) == target
+    if op == '*':
+        p = 1
+        for v in values:
+            p *= v
+        return p == target
+    if op == '/':
+        if len(values) != 2 or 0 in values:
+            return False
+        a, b = values
+        return max(a, b) / min(a, b) == target
+    if op == '=':
+        return values[0] == target
+    return False
+
+
+# it is to generate all possible sequences of numbers in certain length (repeat) 
+def product(values, repeat):
+    if repeat == 1:
+        for v in values:
+            yield (v,)
+        return
+    for v in values:
+        for rest in product(values, repeat - 1):
+            yield (v,) + rest
+
+
+# to identify all valid number combinations that appear inside cage
+def generate_cage_combinations(cells, target, op, n):
+    return [list(c) for c in combination_table(len(cells), target, op, n)]
+
+
+# the combinations only depend on the cage size, so each table is built the first time a
+# solver asks for it and shared by every cage (and every later solve) with the same key
+@lru_cache(maxsize=COMBINATION_CACHE)
+def combination_table(k, target, op, n):
+    return tuple(tuple(c) for c in _build_combinations(k, target, op, n))
+
+
+def _build_combinations(k, target, op, n):
+    values = range(1, n+1)
+    combos = []
+
+    if op == '=':
+        return [[target]]
+
+    if op == '-':
+        for a in values:
+            for b in values:
+                if abs(a - b) == target:
+                    combos.append([a, b])
+        return combos
+
+    if op == '/':
+        for a in values:
+            for b in values:
+                if a != 0 and b != 0 and max(a,b)/min(a,b) == target:
+                    combos.append([a, b])
+        return combos
+
+    if op == '+':
+        if k == 2:
+            for a in values:
+                for b in values:
+                    if a + b == target:
+                        combos.append([a, b])
+        else:
+            for cand in product(values, repeat=k):
+                if sum(cand) == target:
+                    combos.append(list(cand))
+        return combos
+
+    if op == '*':
+        if k == 2:
+            for a in values:
+                for b in values:
+                    if a * b == target:
+                        combos.append([a, b])
+        else:
+            for cand in product(values, repeat=k):
+                p = 1
+                for v in cand:
+                    p *= v
+                if p == target:
+                    combos.append(list(cand))
+        return combos
+
+    return combos
+
+
+# feasibility tables for partially filled cages. everything is cached on small keys
+# (op, target, layout of the open cells, n), so a solver looks a partial cage up instead
+# of recomputing it. "layout" is how many of the open cells share each row and each
+# column: those cells need different values, which tightens the bounds.
+
+
+# sizes of the row groups and of the column groups of some cells, largest first
+@lru_cache(maxsize=None)
+def line_groups(cells):
+    rows = Counter(r for r, _ in cells)
+    cols = Counter(c for _, c in cells)
+    return tuple(sorted(rows.values(), reverse=True)), tuple(sorted(cols.values(), reverse=True))
+
+
+# smallest and largest sum the open cells can reach; a group of g cells in one line
+# holds g different values (1..g at least, n-g+1..n at most)
+@lru_cache(maxsize=None)
+def sum_bounds(groups, n):
+    lo = sum(g * (g + 1) // 2 for g in groups)
+    hi = sum(g * (2 * n - g + 1) // 2 for g in groups)
+    return lo, hi
+
+
+# divisors of target the open cells can multiply up to (distinct values inside a group)
+@lru_cache(maxsize=None)
+def reachable_divisors(target, groups, n):
+    prods = {1}
+    for g in groups:
+        part = set()
+        for combo in combinations(range(1, n+1), g):
+            p = 1
+            for v in combo:
+                p *= v
+            part.add(p)
+        prods = {a * b for a in prods for b in part if target % (a * b) == 0}
+    return frozenset(prods)
+
+
+# values of a two cell '-' or '/' cage that have a partner in 1..n
+@lru_cache(maxsize=None)
+def partner_values(op, target, n):
+    values = range(1, n+1)
+    if op == '-':
+        return frozenset(a for a in values if a + target <= n or a - target >= 1)
+    return frozenset(a for a in values if a * target <= n or a % target == 0)
+
+
+# can the open cells still complete the cage, given the values already placed?
+# rejects a doomed cage as soon as the first value that dooms it is placed
+def partial_feasible(op, target, assigned, open_cells, n):
+    if op == '=' or op == '':
+        return not assigned or assigned[0] == target
+
+    if op == '-' or op == '/':
+        if len(assigned) == 2:
+            return cage_valid(assigned, target, op)
+        if assigned:
+            return assigned[0] in partner_values(op, target, n)
+        return True
+
+    if op == '+':
+        rest = target - sum(assigned)
+        if not open_cells:
+            return rest == 0
+        rows, cols = line_groups(open_cells)
+        lo_r, hi_r = sum_bounds(rows, n)
+        lo_c, hi_c = sum_bounds(cols, n)
+        return max(lo_r, lo_c) <= rest <= min(hi_r, hi_c)
+
+    if op == '*':
+        prod = 1
+        for v in assigned:
+            prod *= v
+        if target % prod:
+            return False
+        rest = target // prod
+        if not open_cells:
+            return rest == 1
+        rows, cols = line_groups(open_cells)
+        return rest in reachable_divisors(target, rows, n) and \
+               rest in reachable_divisors(target, cols, n)
+
+    return True
@@ -0,0 +1,47 @@
+# core.py - the solvers and puzzles without the GUI
+#
+# one import point for headless code: the server, the GUI's pre-solve workers and the
+# import benchmark use it. nothing is loaded until a name is used, and nothing here
+# pulls in tkinter:
+#
+#   from src.core import PUZZLES, puzzle_size, cultural_algorithm
+#
+# the combination tables behind every solver are also built lazily, the first time a
+# cage needs them (cages.combination_table).
+
+import importlib
+
+_EXPORTS = {
+    "PUZZLES": "src.utils",
+    "puzzle_size": "src.utils",
+    "puzzle_hash": "src.utils",
+    "cultural_algorithm": "src.algorithm1",
+    "evaluate_fitness": "src.algorithm1",
+    "permutation_cultural_algorithm": "src.permutation_ca",
+    "backtracking_solve": "src.algorithm2",
+    "cage_backtracking_solve": "src.algorithm2",
+    "restart_backtracking_solve": "src.algorithm2",
+    "backjumping_solve": "src.algorithm2",
+    "count_solutions": "src.algorithm2",
+    "fill_ratio": "src.algorithm2",
+    "SearchTimeout": "src.algorithm2",
+    "propagate": "src.propagation",
+    "cage_domain": "src.propagation",
+    "solve_auto": "src.selector",
+    "verify_solution": "src.verify",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return __all__
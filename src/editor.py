@@ -0,0 +1,182 @@
+# editor.py - puzzle editing with incremental checking
+#
+# holds a puzzle that is being drawn cage by cage and answers "is it solvable,
+# is it unique, which cages conflict" after every edit without starting over:
+#   - the combinations of a cage are computed only when that cage is added or changed,
+#     every other cage keeps its cached list
+#   - propagation starts from those cached lists
+#   - the last solution is re-checked against the edited cages only, if it still
+#     holds nothing is searched; if not, the search tries the old values first so
+#     most cages come back unchanged (repair instead of re-solve)
+
+from src.cages import cage_valid
+from src.propagation import cage_domain, propagate, is_consistent
+from src.algorithm2 import cage_backtracking_solve, count_solutions
+
+OPS = ("+", "-", "*", "/", "=")
+
+
+class PuzzleEditor:
+    def __init__(self, n, cages=()):
+        self.n = n
+        self.cages = {}    # cage id -> (cells, target, op)
+        self.domains = {}  # cage id -> combinations of that cage on its own
+        self.owner = {}    # cell -> cage id
+        self.next_id = 0
+
+        self.solution = None
+        self.unique = None
+        self.dirty = set()  # cages edited since the last check()
+        self.settled = False  # the cages outside self.dirty have passed propagation together
+        self.status = None  # result of the last check(), until the next edit
+
+        for cells, target, op in cages:
+            self.add_cage(cells, target, op)
+
+    # ---- edits, each one recomputes the domain of one cage at most
+
+    def add_cage(self, cells, target, op):
+        cells = sorted({tuple(cell) for cell in cells})
+        if not cells:
+            raise ValueError("a cage needs at least one cell")
+        for r, c in cells:
+            if not (0 <= r < self.n and 0 <= c < self.n):
+                raise ValueError(f"cell {(r, c)} is outside the {self.n}x{self.n} board")
+            if (r, c) in self.owner:
+                raise ValueError(f"cell {(r, c)} already belongs to a cage")
+        self._check_op(cells, target, op)
+
+        cid = self.next_id
+        self.next_id += 1
+        self.cages[cid] = (cells, target, op)
+        self.domains[cid] = cage_domain(cells, target, op, self.n)
+        for cell in cells:
+            self.owner[cell] = cid
+        self.dirty.add(cid)
+        self.status = None
+        return cid
+
+    def remove_cage(self, cid):
+        cells, _, _ = self.cages.pop(cid)
+        del self.domains[cid]
+        for cell in cells:
+            del self.owner[cell]
+        self.dirty.discard(cid)
+        self.status = None
+
+    def set_target(self, cid, target, op):
+        cells, _, _ = self.cages[cid]
+        self._check_op(cells, target, op)
+        self.cages[cid] = (cells, target, op)
+        self.domains[cid] = cage_domain(cells, target, op, self.n)
+        self.dirty.add(cid)
+        self.status = None
+
+    def cage_at(self, cell):
+        return self.owner.get(tuple(cell))
+
+    def _check_op(self, cells, target, op):
+        if op not in OPS:
+            raise ValueError(f"operation must be one of {OPS}")
+        if op == "=" and len(cells) != 1:
+            raise ValueError("'=' cages have exactly one cell")
+        if op in ("-", "/") and len(cells) != 2:
+            raise ValueError(f"'{op}' cages have exactly two cells")
+        if target <= 0:
+            raise ValueError("target must be positive")
+
+    # ---- checking
+
+    # cage list in the same form as utils.PUZZLES
+    def puzzle(self):
+        return [self.cages[cid] for cid in sorted(self.cages)]
+
+    def complete(self):
+        return len(self.owner) == self.n * self.n
+
+    # does the last solution still satisfy the cages edited since it was found?
+    # Latin rows/columns cannot break from cage edits, so the rest need no second look
+    def _solution_holds(self):
+        if self.solution is None or not self.complete():
+            return False
+        for cid in self.dirty:
+            cells, target, op = self.cages[cid]
+            if not cage_valid([self.solution[r][c] for r, c in cells], target, op):
+                return False
+        return True
+
+    # returns a dict:
+    #   complete  - every cell belongs to a cage
+    #   conflicts - ids of cages that cannot be satisfied (alone or with the rest)
+    #   solvable  - True / False, None while the board is not fully caged and no conflict shows
+    #   unique    - True / False, None unless solvable
+    #   solution  - a solution board or None
+    #   searched  - False when the previous solution was re-verified without any search
+    def check(self):
+        if self.status is None:
+            self.status = self._check()
+        return dict(self.status)
+
+    def _check(self):
+        ids = sorted(self.cages)
+        status = {"complete": self.complete(), "conflicts": [], "solvable": None,
+                  "unique": None, "solution": None, "searched": False}
+
+        empty = [cid for cid in ids if not self.domains[cid]]
+        if empty:
+            status["conflicts"] = empty
+            status["solvable"] = False
+            self.solution = None
+            return status
+        if not ids:
+            return status
+
+        cages = [self.cages[cid] for cid in ids]
+        cell_domains, domains = propagate(cages, self.n,
+                                          cage_domains=[self.domains[cid] for cid in ids])
+        if not is_consistent(cell_domains, domains):
+            # once the other cages are known to propagate cleanly the edited ones are to
+            # blame, preferring those left without combinations. an emptied cell only
+            # marks that propagation failed somewhere, its cage is the last resort
+            bad = [cid for cid, d in zip(ids, domains) if not d]
+            if self.settled and self.dirty:
+                bad = [cid for cid in bad if cid in self.dirty] or sorted(self.dirty)
+            if not bad:
+                holes = {(r, c) for r, row in enumerate(cell_domains)
+                         for c, d in enumerate(row) if not d}
+                bad = sorted({self.owner[cell] for cell in holes if cell in self.owner})
+            status["conflicts"] = bad
+            status["solvable"] = False
+            self.solution = None
+            return status
+        self.settled = True
+
+        if not status["complete"]:
+            return status
+
+        if self._solution_holds():
+            # still a solution, but an edit can add or rule out other ones
+            if self.dirty or self.unique is None:
+                self.unique = count_solutions(cages, self.n, domains=domains, limit=2) == 1
+            self.dirty.clear()
+            status.update(solvable=True, unique=self.unique, solution=self.solution)
+            return status
+
+        # repair: combinations matching the old solution are tried first
+        if self.solution is not None:
+            old = self.solution
+            domains = [sorted(d, key=lambda combo: sum(v != old[r][c]
+                                                       for v, (r, c) in zip(combo, cells)))
+                       for d, (cells, _, _) in zip(domains, cages)]
+        board, _, _ = cage_backtracking_solve(cages, self.n, domains=domains)
+        status["searched"] = True
+        self.solution = board
+        self.dirty.clear()
+        if board is None:
+            self.unique = None
+            status["solvable"] = False
+            return status
+
+        self.unique = count_solutions(cages, self.n, domains=domains, limit=2) == 1
+        status.update(solvable=True, unique=self.unique, solution=board)
+        return status
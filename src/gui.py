@@ -1,19 +1,30 @@
 # gui.py — KenKen Solver gui using CA and BT algorithms 
 # ---------------------------------------------------------------------------
 
+import os
+import queue
 import threading
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-from datetime import datetime
 
-from src.utils import PUZZLES
+from src.utils import PUZZLES, puzzle_size
 from src.algorithm1 import cultural_algorithm
-from src.algorithm2 import compute_animation_sequence
+from src.algorithm2 import AnimatedBacktrackingSolver
+from src.results_store import DEFAULT_PATH, ResultsStore, make_record
+from src.selector import solve_auto
+from src.editor import OPS, PuzzleEditor
+from src.presolve import PreSolver
 
 CELL_SIZE = 70
 FONT_NUM = ("Arial", 24, "bold")
 FONT_CAGE = ("Arial", 12)
 BT_DELAY = 60  # BT animation speed in ms
+BT_QUEUE_SIZE = 256  # BT actions searched ahead of the animation before the search waits
+EDIT_SIZES = [3, 4, 5, 6, 7, 8, 9]
+HOVER_DELAY = 300  # ms a puzzle has to stay highlighted in the dropdown before it is pre-solved
+PRESOLVE_POLL = 100  # ms between checks on a background solve "Solve" is waiting for
+PRESOLVE_ALGS = {"Cultural Algorithm": "ca", "Auto": "auto"}  # BT is animated live instead
 
 
 class KenKenGUI:
@@ -40,13 +51,29 @@ class KenKenGUI:
         self.stop_ca = False
         self.last_ca_time = 0.0
         self.last_ca_gens = 0
-
-        # BT animation state
-        self.bt_actions = []
+        self.last_ca_grid = None
+        self.last_ca_fit = None
+        self.last_ca_solver = "ca"  # solver label used when saving
+
+        # BT animation state, the search thread feeds bt_queue while the animation reads it
+        self.bt_queue = None
+        self.bt_done = threading.Event()
+        self.bt_error = None
         self.skip_bt_animation = False
         self.bt_steps = 0
         self.bt_time = 0
         self.final_bt_board = None
+        self.bt_solver = "bt"
+
+        # puzzle editor state, checked again after every edit
+        self.editor = None
+        self.edit_selection = set()
+        self.edit_cage = None  # id of the cage being edited, None when drawing a new one
+
+        # background pre-solving of the loaded / highlighted puzzle
+        self.presolver = PreSolver()
+        self.hover_job = None
+        self.hover_bound = False
 
         # the top UI panel
 
@@ -58,9 +85,11 @@ class KenKenGUI:
         self.puzzle_var = tk.StringVar(value=list(PUZZLES.keys())[0])
         self.dropdown_puzzles = ttk.Combobox(
             top, textvariable=self.puzzle_var,
-            values=list(PUZZLES.keys()), width=32
+            values=list(PUZZLES.keys()), width=32, postcommand=self.bind_dropdown_hover
         )
         self.dropdown_puzzles.grid(row=0, column=1, padx=5)
+        self.dropdown_puzzles.bind("<<ComboboxSelected>>",
+                                   lambda e: self.presolve(self.puzzle_var.get()))
         ttk.Button(top, text="Load Puzzle", command=self.load_puzzle).grid(row=0, column=2, padx=5)
 
         # algorithm dropdown
@@ -68,9 +97,10 @@ class KenKenGUI:
         self.alg_var = tk.StringVar(value="Cultural Algorithm")
         self.alg_dropdown = ttk.Combobox(
             top, textvariable=self.alg_var,
-            values=["Cultural Algorithm", "Backtracking"], width=32
+            values=["Cultural Algorithm", "Backtracking", "Auto"], width=32
         )
         self.alg_dropdown.grid(row=1, column=1)
+        self.alg_dropdown.bind("<<ComboboxSelected>>", lambda e: self.presolve_loaded())
 
         # solve button
         self.btn_solve = ttk.Button(top, text="Solve", command=self.solve)
@@ -110,6 +140,26 @@ class KenKenGUI:
         self.btn_save = ttk.Button(top, text="Save Result", command=self.save_result)
         self.btn_save.grid(row=6, column=0, columnspan=3, pady=5)
 
+        # puzzle editor: click free cells to select them, click a cage to edit it
+        edit = tk.Frame(top)
+        edit.grid(row=7, column=0, columnspan=3, pady=5)
+        self.edit_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(edit, text="Edit Mode", variable=self.edit_var,
+                        command=self.toggle_edit).grid(row=0, column=0, padx=5)
+        self.edit_size_var = tk.IntVar(value=6)
+        ttk.Combobox(edit, textvariable=self.edit_size_var, values=EDIT_SIZES,
+                     width=4).grid(row=0, column=1)
+        ttk.Button(edit, text="New Board", command=self.new_puzzle).grid(row=0, column=2, padx=5)
+        ttk.Label(edit, text="Target:").grid(row=0, column=3)
+        self.edit_target_var = tk.StringVar()
+        ttk.Entry(edit, textvariable=self.edit_target_var, width=6).grid(row=0, column=4)
+        self.edit_op_var = tk.StringVar(value="+")
+        ttk.Combobox(edit, textvariable=self.edit_op_var, values=list(OPS),
+                     width=3).grid(row=0, column=5, padx=5)
+        ttk.Button(edit, text="Set Cage", command=self.set_cage).grid(row=0, column=6, padx=5)
+        ttk.Button(edit, text="Remove Cage", command=self.remove_cage).grid(row=0, column=7, padx=5)
+        ttk.Button(edit, text="Use Puzzle", command=self.use_puzzle).grid(row=0, column=8, padx=5)
+
         # status labels
         self.status_label = ttk.Label(root, text="Status: Idle")
         self.status_label.pack()
@@ -194,6 +244,8 @@ class KenKenGUI:
                 )
                 cell_ids[r][c] = tid
 
+        canvas.bind("<Button-1>", self.on_canvas_click)
+
     # load puzzle function
 
     def load_puzzle(self):
@@ -203,6 +255,10 @@ class KenKenGUI:
 
         self.current_cages = cages
         self.current_n = n
+        self.last_ca_grid = None
+        self.final_bt_board = None
+        self.editor = None
+        self.edit_var.set(False)
 
         # build CA canvas
         self.build_canvas(cages, n, side="left")
@@ -225,6 +281,213 @@ class KenKenGUI:
 
         self.status_label.config(text=f"Loaded puzzle: {name}")
         self.gen_label.config(text="Gen: 0 | Fitness: ?")
+        self.presolve_loaded()
+
+    # ---- background pre-solving
+
+    # start solving a stored puzzle with the selected algorithm; anything else the
+    # pre-solver was doing is cancelled
+    def presolve(self, name):
+        algorithm = PRESOLVE_ALGS.get(self.alg_var.get())
+        if algorithm is None or name not in PUZZLES:
+            self.presolver.cancel()
+            return
+        cages = PUZZLES[name]
+        self.presolver.start(algorithm, cages, puzzle_size(cages))
+
+    def presolve_loaded(self):
+        if self.current_cages is not None and self.editor is None:
+            self.presolve(self.puzzle_var.get())
+
+    # the dropdown list only exists once it has been opened, hook its mouse motion then
+    def bind_dropdown_hover(self):
+        if self.hover_bound:
+            return
+        popdown = self.root.tk.call("ttk::combobox::PopdownWindow", self.dropdown_puzzles)
+        listbox = f"{popdown}.f.l"
+        cmd = self.root.register(lambda y: self.on_dropdown_hover(listbox, y))
+        self.root.tk.call("bind", listbox, "<Motion>", f"+{cmd} %y")
+        self.hover_bound = True
+
+    # pre-solve the highlighted puzzle once the mouse rests on it for HOVER_DELAY
+    def on_dropdown_hover(self, listbox, y):
+        index = int(self.root.tk.call(listbox, "nearest", y))
+        names = self.dropdown_puzzles["values"]
+        if not 0 <= index < len(names):
+            return
+        if self.hover_job is not None:
+            self.root.after_cancel(self.hover_job)
+        self.hover_job = self.root.after(HOVER_DELAY, self.presolve, names[index])
+
+    # "Solve" hit a background job that is still running: wait for it instead of
+    # starting over, fall back to a normal solve if it fails
+    def attach_presolve(self, algorithm, show, fallback):
+        cages = self.current_cages
+        n = self.current_n
+        self.disable_buttons()
+        self.stop_ca = False
+        self.gen_label.config(text="")
+        self.status_label.config(text="Finishing background solve...")
+
+        def check():
+            result = self.presolver.result(algorithm, cages, n)
+            if result is not None:
+                self.enable_buttons()
+                show(*result, presolved=True)
+            elif self.stop_ca:
+                self.presolver.cancel()
+                self.status_label.config(text="CA Stopped by User")
+                self.enable_buttons()
+            elif self.presolver.running(algorithm, cages, n):
+                self.root.after(PRESOLVE_POLL, check)
+            else:
+                self.enable_buttons()
+                fallback()
+
+        check()
+
+    # cached result, in-flight job or nothing. returns True when "Solve" is taken care of
+    def use_presolve(self, algorithm, show, fallback):
+        cages = self.current_cages
+        n = self.current_n
+        if self.editor is None:
+            result = self.presolver.result(algorithm, cages, n)
+            if result is not None:
+                show(*result, presolved=True)
+                return True
+            if self.presolver.running(algorithm, cages, n):
+                self.attach_presolve(algorithm, show, fallback)
+                return True
+        self.presolver.cancel()  # the foreground solve gets the CPU
+        return False
+
+    # ---- puzzle editor
+
+    # start editing the loaded puzzle, or an empty board when none is loaded
+    def toggle_edit(self):
+        if not self.edit_var.get():
+            self.editor = None
+            if self.current_cages is not None:
+                self.build_canvas(self.current_cages, self.current_n, side="left")
+            self.status_label.config(text="Edit mode off")
+            return
+        if self.current_cages is not None:
+            self.editor = PuzzleEditor(self.current_n, self.current_cages)
+        else:
+            self.editor = PuzzleEditor(int(self.edit_size_var.get()))
+        self.edit_selection = set()
+        self.edit_cage = None
+        self.redraw_editor()
+
+    def new_puzzle(self):
+        self.edit_var.set(True)
+        self.editor = PuzzleEditor(int(self.edit_size_var.get()))
+        self.edit_selection = set()
+        self.edit_cage = None
+        self.redraw_editor()
+
+    def on_canvas_click(self, event):
+        if self.editor is None:
+            return
+        cell = (int(event.y // CELL_SIZE), int(event.x // CELL_SIZE))
+        if not (0 <= cell[0] < self.editor.n and 0 <= cell[1] < self.editor.n):
+            return
+
+        cid = self.editor.cage_at(cell)
+        if cid is not None:
+            # pick an existing cage so its target/op can be changed or the cage removed
+            cells, target, op = self.editor.cages[cid]
+            self.edit_cage = cid
+            self.edit_selection = set(cells)
+            self.edit_target_var.set(str(target))
+            self.edit_op_var.set(op)
+        else:
+            if self.edit_cage is not None:
+                self.edit_cage = None
+                self.edit_selection = set()
+            self.edit_selection ^= {cell}
+        self.redraw_editor(check=False)
+
+    # add the selected cells as a cage, or change target/op of the selected cage
+    def set_cage(self):
+        if self.editor is None or not self.edit_selection:
+            return
+        try:
+            target = int(self.edit_target_var.get())
+            if self.edit_cage is not None:
+                self.editor.set_target(self.edit_cage, target, self.edit_op_var.get())
+            else:
+                self.editor.add_cage(self.edit_selection, target, self.edit_op_var.get())
+        except ValueError as e:
+            self.status_label.config(text=f"Edit: {e}")
+            return
+        self.edit_selection = set()
+        self.edit_cage = None
+        self.redraw_editor()
+
+    def remove_cage(self):
+        if self.editor is None or self.edit_cage is None:
+            return
+        self.editor.remove_cage(self.edit_cage)
+        self.edit_selection = set()
+        self.edit_cage = None
+        self.redraw_editor()
+
+    # make the edited puzzle the current one and add it to the puzzle list
+    def use_puzzle(self):
+        if self.editor is None:
+            return
+        status = self.editor.check()
+        if not status["complete"]:
+            messagebox.showwarning("Puzzle not finished", "Every cell must belong to a cage.")
+            return
+        n = self.editor.n
+        k = 1
+        while f"Custom {n}x{n} #{k}" in PUZZLES:
+            k += 1
+        name = f"Custom {n}x{n} #{k}"
+        PUZZLES[name] = self.editor.puzzle()
+        self.dropdown_puzzles.config(values=list(PUZZLES.keys()))
+        self.puzzle_var.set(name)
+        self.load_puzzle()
+
+    # draw the edited puzzle with the selection, conflicting cages and the current solution.
+    # the check is incremental so it can run on every click
+    def redraw_editor(self, check=True):
+        ed = self.editor
+        self.build_canvas(ed.puzzle(), ed.n, side="left")
+        canvas = self.canvas_left
+        status = ed.check() if check or ed.status is not None else None
+
+        def shade(cells, color):
+            for r, c in cells:
+                rect = canvas.create_rectangle(c*CELL_SIZE, r*CELL_SIZE, (c+1)*CELL_SIZE,
+                                               (r+1)*CELL_SIZE, fill=color, outline="")
+                canvas.tag_lower(rect)
+
+        if status is not None:
+            for cid in status["conflicts"]:
+                shade(ed.cages[cid][0], "#f4c2c2")
+        shade(self.edit_selection, "#cde4f7")
+
+        if status is None:
+            return
+        if status["solution"] is not None:
+            for r in range(ed.n):
+                for c in range(ed.n):
+                    canvas.itemconfig(self.cell_text_left[r][c],
+                                      text=str(status["solution"][r][c]), fill="grey")
+
+        if status["conflicts"]:
+            text = f"Edit: {len(status['conflicts'])} conflicting cage(s)"
+        elif status["solvable"] is False:
+            text = "Edit: no solution"
+        elif status["solvable"] is None:
+            text = f"Edit: {ed.n*ed.n - len(ed.owner)} cell(s) without a cage"
+        else:
+            text = "Edit: solvable, unique" if status["unique"] else \
+                "Edit: solvable, NOT unique"
+        self.status_label.config(text=text)
 
     # CA live update callback
     def update_canvas_ca(self, grid, fit, gen):
@@ -248,11 +511,37 @@ class KenKenGUI:
 
         if self.alg_var.get() == "Cultural Algorithm":
             self.solve_ca()
+        elif self.alg_var.get() == "Auto":
+            self.solve_auto()
         else:
             self.solve_bt()
 
+    # final CA result: canvas, status and what Save Result stores
+    def show_ca_result(self, sol, fit, t, gen, presolved=False):
+        n = self.current_n
+        self.last_ca_time = t
+        self.last_ca_gens = gen
+        self.last_ca_grid = sol
+        self.last_ca_fit = fit
+        self.last_ca_solver = "ca"
+
+        # Draw final
+        for r in range(n):
+            for c in range(n):
+                self.canvas_left.itemconfig(self.cell_text_left[r][c], text=str(sol[r][c]))
+
+        label = "CA Solved (pre-solved)" if presolved else "CA Solved"
+        self.status_label.config(
+            text=f"{label} | Time {t:.6f}s | Gens {gen} | Fitness {fit}"
+        )
+
+        self.label_ca_time.config(text=f"CA Time: {t:.6f}s")
+        self.label_ca_gens.config(text=f"CA Gens: {gen}")
+
     # solve function for CA
     def solve_ca(self):
+        if self.use_presolve("ca", self.show_ca_result, self.solve_ca):
+            return
         self.disable_buttons()
         self.stop_ca = False
         self.gen_label.config(text="")
@@ -270,21 +559,7 @@ class KenKenGUI:
                     update_interval=interval,
                     should_stop=lambda: self.stop_ca
                 )
-
-                self.last_ca_time = t
-                self.last_ca_gens = gen
-
-                # Draw final
-                for r in range(n):
-                    for c in range(n):
-                        self.canvas_left.itemconfig(self.cell_text_left[r][c], text=str(sol[r][c]))
-
-                self.status_label.config(
-                    text=f"CA Solved | Time {t:.6f}s | Gens {gen} | Fitness {fit}"
-                )
-
-                self.label_ca_time.config(text=f"CA Time: {t:.6f}s")
-                self.label_ca_gens.config(text=f"CA Gens: {gen}")
+                self.show_ca_result(sol, fit, t, gen)
 
             except Exception as e:
                 if "Force-Stopped" in str(e):
@@ -296,76 +571,157 @@ class KenKenGUI:
 
         threading.Thread(target=worker).start()
 
+    # final Auto result, kept where Save Result looks for it
+    def show_auto_result(self, sol, info, presolved=False):
+        n = self.current_n
+        if sol is not None:
+            for r in range(n):
+                for c in range(n):
+                    v = sol[r][c]
+                    self.canvas_left.itemconfig(self.cell_text_left[r][c],
+                                                text=str(v) if v else "")
+
+        if info["generations"] is not None:
+            self.last_ca_solver = info["solver"]
+            self.last_ca_grid = sol
+            self.last_ca_fit = info["fitness"]
+            self.last_ca_time = info["time"]
+            self.last_ca_gens = info["generations"]
+        else:
+            self.bt_solver = info["solver"]
+            self.final_bt_board = sol
+            self.bt_time = info["time"]
+            self.bt_steps = info["steps"]
+
+        work = info["steps"] if info["steps"] is not None else info["generations"]
+        label = "Auto (pre-solved)" if presolved else "Auto"
+        self.status_label.config(
+            text=f"{label} -> {info['solver']} | Time {info['time']:.6f}s | Steps/Gens {work}"
+        )
+
+    # solve function for Auto: the selector picks the solver expected to be fastest
+    def solve_auto(self):
+        if self.use_presolve("auto", self.show_auto_result, self.solve_auto):
+            return
+        self.disable_buttons()
+        self.stop_ca = False
+        self.gen_label.config(text="")
+        self.status_label.config(text="Solving (Auto)...")
+
+        cages = self.current_cages
+        n = self.current_n
+
+        def worker():
+            try:
+                # "Force Stop CA" stops whichever solver was picked, it hands back its best board
+                sol, info = solve_auto(cages, n, should_stop=lambda: self.stop_ca)
+                self.show_auto_result(sol, info)
+                if self.stop_ca:
+                    self.status_label.config(text=f"Auto -> {info['solver']} Stopped by User")
+            except Exception as e:
+                messagebox.showerror("Auto Error", str(e))
+
+            self.enable_buttons()
+
+        threading.Thread(target=worker).start()
+
     # force stop CA
     def force_stop_ca(self):
         self.stop_ca = True
 
     # solve function for BT
+    # the search runs in a thread and streams its actions through a bounded queue, so the
+    # animation starts right away and the search pauses whenever it gets too far ahead
     def solve_bt(self):
         cages = self.current_cages
         n = self.current_n
 
         self.disable_buttons()
-        self.status_label.config(text="")
         self.gen_label.config(text="")
-        self.status_label.config(text="Running BT...")
-        
+        self.status_label.config(text="Animating BT...")
 
-        def worker():
+        solver = AnimatedBacktrackingSolver(cages, n)
+        self.bt_solver = "bt"
+        self.bt_queue = queue.Queue(maxsize=BT_QUEUE_SIZE)
+        self.bt_done = threading.Event()
+        self.bt_error = None
+        self.final_bt_board = None
+        self.skip_bt_animation = False
+        self.btn_skip_bt.config(state="normal")
+
+        def producer():
+            start = time.time()
+            waited = 0.0  # time spent blocked on the animation, not part of the solve time
             try:
-                sol, steps, t, actions = compute_animation_sequence(cages, n)
+                for action in solver.iter_actions():
+                    t0 = time.time()
+                    while not self.skip_bt_animation:
+                        try:
+                            self.bt_queue.put(action, timeout=0.1)
+                            break
+                        except queue.Full:
+                            pass
+                    waited += time.time() - t0
+            except Exception as e:
+                self.bt_error = e
 
-                self.final_bt_board = sol
-                self.bt_steps = steps
-                self.bt_time = t
-                self.bt_actions = actions[:]
-                self.skip_bt_animation = False
+            self.bt_time = time.time() - start - waited
+            self.bt_steps = solver.steps
+            self.final_bt_board = [row[:] for row in solver.board]
+            self.bt_done.set()
 
-                self.btn_skip_bt.config(state="normal")
+        threading.Thread(target=producer, daemon=True).start()
+        self.root.after(10, self.animate_bt_step)
 
-                if self.comp_var.get():
-                    self.label_bt_time.config(text=f"BT Time: {t:.6f}s")
-                    self.label_bt_steps.config(text=f"BT Steps: {steps}")
+    # BT run finished (or skipped): final board, metrics and buttons
+    def finish_bt(self, canvas, ids, skipped):
+        if self.bt_error is not None:
+            messagebox.showerror("BT Error", str(self.bt_error))
+            self.btn_skip_bt.config(state="disabled")
+            self.enable_buttons()
+            return
 
-                self.status_label.config(text="Animating BT...")
-                self.root.after(10, self.animate_bt_step)
+        if skipped:
+            for r in range(self.current_n):
+                for c in range(self.current_n):
+                    canvas.itemconfig(ids[r][c], text=str(self.final_bt_board[r][c]), fill="black")
 
-            except Exception as e:
-                messagebox.showerror("BT Error", str(e))
-                self.enable_buttons()
+        if self.comp_var.get():
+            self.label_bt_time.config(text=f"BT Time: {self.bt_time:.6f}s")
+            self.label_bt_steps.config(text=f"BT Steps: {self.bt_steps}")
 
-        threading.Thread(target=worker).start()
+        label = "BT Solved (Animation Skipped)" if skipped else "BT Solved"
+        self.status_label.config(
+            text=f"{label} | Time {self.bt_time:.6f}s | Steps {self.bt_steps}"
+        )
+        self.btn_skip_bt.config(state="disabled")
+        self.enable_buttons()
 
     # BT animation loop
     def animate_bt_step(self):
         canvas = self.canvas_left if not self.comp_var.get() else self.canvas_right
         ids = self.cell_text_left if not self.comp_var.get() else self.cell_text_right
 
-        # skip animation immediately
+        # skip animation, wait for the search to finish without drawing
         if self.skip_bt_animation:
-            for r in range(self.current_n):
-                for c in range(self.current_n):
-                    canvas.itemconfig(ids[r][c], text=str(self.final_bt_board[r][c]), fill="black")
-
-            self.status_label.config(
-                text=f"BT Solved (Animation Skipped) | Time {self.bt_time:.6f}s | Steps {self.bt_steps}"
-            )
-            self.btn_skip_bt.config(state="disabled")
-            self.enable_buttons()
+            if not self.bt_done.is_set():
+                self.status_label.config(text="Finishing BT search...")
+                self.root.after(BT_DELAY, self.animate_bt_step)
+                return
+            self.finish_bt(canvas, ids, skipped=True)
             return
 
-        # animation end
-        if not self.bt_actions:
-            self.status_label.config(
-                text=f"BT Solved | Time {self.bt_time:.6f}s | Steps {self.bt_steps}"
-            )
-            self.btn_skip_bt.config(state="disabled")
-            self.enable_buttons()
+        try:
+            r, c, val, is_trial = self.bt_queue.get_nowait()
+        except queue.Empty:
+            # animation end
+            if self.bt_done.is_set() and self.bt_queue.empty():
+                self.finish_bt(canvas, ids, skipped=False)
+            else:
+                self.root.after(BT_DELAY, self.animate_bt_step)
             return
 
         # perform next animation action
-        r, c, val, is_trial = self.bt_actions.pop(0)
-
         if is_trial:
             canvas.itemconfig(ids[r][c], text=str(val), fill="blue")
         else:
@@ -395,54 +751,52 @@ class KenKenGUI:
 
         self.btn_skip_bt.config(state="disabled")
 
-    # save result to file
+    # save result to the append-only results store (one json line per algorithm run)
     def save_result(self):
-        if not self.canvas_left:
+        if self.last_ca_grid is None and self.final_bt_board is None:
             messagebox.showwarning("No result", "Solve a puzzle first.")
             return
 
+        folder, name = os.path.split(DEFAULT_PATH)
         filename = filedialog.asksaveasfilename(
-            defaultextension=".txt",
-            filetypes=[("Text files", "*.txt"), ("CSV files", "*.csv")]
+            defaultextension=".jsonl",
+            initialdir=folder, initialfile=name, confirmoverwrite=False,
+            filetypes=[("JSON Lines", "*.jsonl")]
         )
         if not filename:
             return
 
-        with open(filename, "w") as f:
-            f.write(f"Solved on: {datetime.now()}\n")
-            f.write(f"Puzzle: {self.puzzle_var.get()}\n")
-
-            # if single algorithm mode
-            if not self.comp_var.get():
-                alg = self.alg_var.get()
-                f.write(f"Algorithm: {alg}\n")
-
-                if alg == "Cultural Algorithm":
-                    f.write(f"CA Time: {self.last_ca_time:.6f}s\n")
-                    f.write(f"CA Generations: {self.last_ca_gens}\n")
+        cages = self.current_cages
+        n = self.current_n
+        puzzle_name = self.puzzle_var.get()
 
-                else:
-                    f.write(f"BT Time: {self.bt_time:.6f}s\n")
-                    f.write(f"BT Steps: {self.bt_steps}\n")
+        # in single algorithm mode only the selected algorithm is saved
+        if self.comp_var.get() or self.alg_var.get() == "Auto":
+            algs = ["Cultural Algorithm", "Backtracking"]
+        else:
+            algs = [self.alg_var.get()]
+
+        records = []
+        if "Cultural Algorithm" in algs and self.last_ca_grid is not None:
+            records.append(make_record(
+                cages, n, self.last_ca_solver, self.last_ca_time, solution=self.last_ca_grid,
+                generations=self.last_ca_gens, fitness=self.last_ca_fit,
+                puzzle_name=puzzle_name
+            ))
+        if "Backtracking" in algs and self.final_bt_board is not None:
+            records.append(make_record(
+                cages, n, self.bt_solver, self.bt_time, solution=self.final_bt_board,
+                steps=self.bt_steps, puzzle_name=puzzle_name
+            ))
+
+        if not records:
+            messagebox.showwarning("No result", "Solve a puzzle first.")
+            return
 
-            # if comparison mode
-            else:
-                f.write("Algorithm: Comparison Mode\n")
-                f.write(f"CA Time: {self.last_ca_time:.6f}s\n")
-                f.write(f"CA Generations: {self.last_ca_gens}\n")
-                f.write(f"BT Time: {self.bt_time:.6f}s\n")
-                f.write(f"BT Steps: {self.bt_steps}\n")
-
-            # solution grid output
-            f.write("\nSolution Grid:\n")
-            for r in range(self.current_n):
-                row_vals = [
-                    self.canvas_left.itemcget(self.cell_text_left[r][c], "text")
-                    for c in range(self.current_n)
-                ]
-                f.write(", ".join(row_vals) + "\n")
+        with ResultsStore(filename) as store:
+            store.extend(records)
 
-        messagebox.showinfo("Saved", "Solution exported successfully!")
+        messagebox.showinfo("Saved", f"{len(records)} run(s) appended to {filename}")
 
     # buttons enable & disable functions used during solving
     def disable_buttons(self):
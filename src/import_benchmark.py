@@ -0,0 +1,74 @@
+# import_benchmark.py - start-up cost of the solver modules
+#
+#   - cold import: a fresh interpreter imports one module, median over --repeat runs,
+#     and reports whether tkinter came along
+#   - spawn latency: a "spawn" process pool (what Windows/macOS always use) is created
+#     and one task is run that solves a small puzzle; measured from Pool() to the result
+#
+#   python -m src.import_benchmark --repeat 5
+
+import argparse
+import multiprocessing as mp
+import statistics
+import subprocess
+import sys
+import time
+
+MODULES = ("src.core", "src.utils", "src.algorithm2", "src.algorithm1", "src.main", "src.gui")
+
+_PROBE = """
+import sys, time
+t = time.perf_counter()
+import {module}
+print(time.perf_counter() - t, "tkinter" in sys.modules)
+"""
+
+
+def cold_import(module, repeat):
+    times = []
+    tk = False
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", _PROBE.format(module=module)],
+                             capture_output=True, text=True, check=True).stdout.split()
+        times.append(float(out[0]))
+        tk = out[1] == "True"
+    return statistics.median(times), tk
+
+
+# the task a solving worker runs first: import the core and solve the smallest puzzle
+def _first_task(_):
+    from src.core import PUZZLES, backtracking_solve, puzzle_size
+    cages = PUZZLES["4x4 Easy #151931"]
+    board, _, _ = backtracking_solve(cages, puzzle_size(cages))
+    return board is not None
+
+
+def spawn_latency(repeat):
+    ctx = mp.get_context("spawn")
+    times = []
+    for _ in range(repeat):
+        t = time.perf_counter()
+        with ctx.Pool(1) as pool:
+            pool.map(_first_task, [0])
+            times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Cold import and spawn worker start-up times")
+    ap.add_argument("--repeat", type=int, default=5)
+    args = ap.parse_args(argv)
+
+    print(f"{'module':<16} {'import ms':>10}  tkinter")
+    for module in MODULES:
+        try:
+            t, tk = cold_import(module, args.repeat)
+        except subprocess.CalledProcessError:
+            print(f"{module:<16} {'failed':>10}")
+            continue
+        print(f"{module:<16} {t*1000:>10.1f}  {'yes' if tk else 'no'}")
+    print(f"spawn worker, first result: {spawn_latency(args.repeat)*1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
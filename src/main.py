@@ -1,4 +1,3 @@
-from src.gui import launch_gui
-
 if __name__ == "__main__":
+    from src.gui import launch_gui  # Tk is only loaded for the GUI, the solvers import without it
     launch_gui() #call function of starting the gui
@@ -0,0 +1,94 @@
+# parallel.py - CA fitness evaluation spread over a pool of worker processes
+#
+# the population lives in shared memory as one row of cell values per individual
+# (cage by cage, in cage cell order). every generation the main process writes the
+# rows once, each worker scores a slice of them in place and writes the fitness and
+# the repaired grid back into shared arrays, so nothing but (start, end, seed) is
+# pickled per task. fitness travels as a double plus a flag telling whether the
+# function returned an int, so scores come back with the type they have in serial mode.
+#
+# the Latin repair of individual k uses random.Random(seed + k) in serial mode too,
+# so a seeded run gives the same result with any number of workers.
+
+import multiprocessing as mp
+import random
+from multiprocessing import shared_memory
+
+from src.algorithm1 import repair_latin
+
+_worker = {}  # per-process state set up by _init_worker
+
+
+def _init_worker(names, cages, n, fitness_fn, pop_size, repair):
+    cells = [cell for c, _, _ in cages for cell in c]
+    shms = [shared_memory.SharedMemory(name=name) for name in names]
+    _worker.update(
+        shms=shms,  # kept so the mappings stay open
+        pop=shms[0].buf, fit=shms[1].buf.cast("d"), grids=shms[2].buf, is_int=shms[3].buf,
+        cages=cages, n=n, cells=cells, fitness_fn=fitness_fn, repair=repair,
+    )
+
+
+def _score_slice(task):
+    start, end, seed = task
+    w = _worker
+    n, cells, L = w["n"], w["cells"], len(w["cells"])
+    rows = bytes(w["pop"][start*L:end*L])
+    out = bytearray((end - start) * n * n)
+    for k in range(start, end):
+        vals = rows[(k-start)*L:(k-start+1)*L]
+        grid = [[0]*n for _ in range(n)]
+        for (r, c), v in zip(cells, vals):
+            grid[r][c] = v
+        grid = w["repair"](grid, n, random.Random(seed + k))
+        f = w["fitness_fn"](grid, w["cages"], n)
+        w["fit"][k] = f
+        w["is_int"][k] = isinstance(f, int)
+        out[(k-start)*n*n:(k-start+1)*n*n] = bytes(v for row in grid for v in row)
+    w["grids"][start*n*n:end*n*n] = out
+    return end - start
+
+
+class SharedPopulationScorer:
+    def __init__(self, cages, n, fitness_fn, pop_size, workers, repair=repair_latin):
+        self.n = n
+        self.pop_size = pop_size
+        self.L = sum(len(cells) for cells, _, _ in cages)
+        self.shms = [
+            shared_memory.SharedMemory(create=True, size=pop_size * self.L),
+            shared_memory.SharedMemory(create=True, size=pop_size * 8),
+            shared_memory.SharedMemory(create=True, size=pop_size * n * n),
+            shared_memory.SharedMemory(create=True, size=pop_size),
+        ]
+        self.fit = self.shms[1].buf.cast("d")
+        names = [shm.name for shm in self.shms]
+        self.pool = mp.Pool(workers, initializer=_init_worker,
+                            initargs=(names, cages, n, fitness_fn, pop_size, repair))
+
+        # a few slices per worker so one slow slice does not hold the generation up
+        parts = min(pop_size, workers * 4)
+        bounds = [pop_size * i // parts for i in range(parts + 1)]
+        self.slices = [(a, b) for a, b in zip(bounds, bounds[1:]) if a < b]
+
+    # fitness of every individual, in population order
+    def score(self, population, seed):
+        self.shms[0].buf[:self.pop_size * self.L] = bytes(
+            v for indiv in population for combo in indiv for v in combo)
+        self.pool.map(_score_slice, [(a, b, seed) for a, b in self.slices])
+        # the shared array only holds doubles, ints are restored from the flags
+        flags = bytes(self.shms[3].buf[:self.pop_size])
+        return [int(f) if flag else f for f, flag in zip(self.fit, flags)]
+
+    # the repaired grid individual k was scored on
+    def grid(self, k):
+        n = self.n
+        row = bytes(self.shms[2].buf[k*n*n:(k+1)*n*n])
+        return [list(row[r*n:(r+1)*n]) for r in range(n)]
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+        self.fit.release()
+        for shm in self.shms:
+            shm.close()
+            shm.unlink()
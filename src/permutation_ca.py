@@ -0,0 +1,210 @@
+# permutation_ca.py - cultural algorithm with a row-permutation genotype
+#
+# every individual is a list of n rows and every row is a permutation of 1..n, so the
+# row constraints hold by construction and no Latin repair is needed:
+#   - fitness counts only column duplicates and violated cages
+#   - crossover takes whole rows from the parents, which keeps every row a permutation
+#   - mutation swaps two cells of a row, preferring cells that clash with their column
+#     or hold a value their cage's combinations do not allow, and partners that keep
+#     both values allowed
+#   - the belief space keeps the best individual (situational) and, per row, the rows
+#     used by the elites (normative)
+#
+# same signature and return value as algorithm1.cultural_algorithm
+
+import random
+import time
+
+from src.cages import cage_valid
+from src.propagation import cage_domain, propagate, is_consistent, solved_board
+from src.algorithm1 import SELECTION_STRATEGIES
+
+
+# column duplicates + 7 per violated cage (the same weights as evaluate_fitness)
+def permutation_fitness(rows, cages, n):
+    col_pen = 0
+    for c in range(n):
+        col_pen += n - len({rows[r][c] for r in range(n)})
+
+    cage_pen = 0
+    for cells, target, op in cages:
+        if not cage_valid([rows[r][c] for r, c in cells], target, op):
+            cage_pen += 1
+
+    return col_pen + cage_pen * 7
+
+
+# values each cell can take according to its cage's combinations (and propagation)
+def allowed_values(cages, n, cell_domains=None):
+    allowed = [[set(range(1, n+1)) for _ in range(n)] for _ in range(n)]
+    for cells, target, op in cages:
+        combos = cage_domain(cells, target, op, n)
+        for p, (r, c) in enumerate(cells):
+            allowed[r][c] = {combo[p] for combo in combos} or allowed[r][c]
+    if cell_domains is not None:
+        for r in range(n):
+            for c in range(n):
+                allowed[r][c] &= cell_domains[r][c]
+    return allowed
+
+
+# a random permutation of 1..n for row r that respects `allowed` where it easily can
+def random_row(r, n, allowed):
+    cols = list(range(n))
+    random.shuffle(cols)
+    cols.sort(key=lambda c: len(allowed[r][c])) # tightest cells pick first
+    left = set(range(1, n+1))
+    row = [0] * n
+    for c in cols:
+        fits = list(left & allowed[r][c])
+        v = random.choice(fits) if fits else random.choice(list(left))
+        row[c] = v
+        left.discard(v)
+    return row
+
+
+# swap two cells of row r. the first cell is preferably one that breaks something: a value
+# its cage does not allow, or a value repeated in its column (col_dups), and the partner is
+# chosen so both values end up allowed. otherwise a plain random swap
+def biased_swap(rows, r, allowed, col_dups):
+    row = rows[r]
+    n = len(row)
+    choice = random.random()
+    if choice < 0.35:
+        bad = [c for c in range(n) if row[c] not in allowed[r][c]]
+    elif choice < 0.7:
+        bad = [c for c in range(n) if col_dups[c]
+               and any(rows[k][c] == row[c] for k in range(n) if k != r)]
+    else:
+        bad = []
+
+    if bad:
+        a = random.choice(bad)
+        good = [b for b in range(n) if b != a
+                and row[b] in allowed[r][a] and row[a] in allowed[r][b]]
+        b = random.choice(good) if good else random.choice([b for b in range(n) if b != a])
+    else:
+        a, b = random.sample(range(n), 2)
+    row[a], row[b] = row[b], row[a]
+
+
+def permutation_cultural_algorithm(
+    cages,
+    n,
+    pop_size=100,
+    generations=5000,
+    mutation_rate=0.3, # chance per row of a swap
+    acceptance_ratio=0.19,
+    update_interval=10,
+    gui_callback=None,
+    should_stop=lambda: False,
+    time_limit=None,
+    use_propagation=True,
+    selection="truncation",
+    seed=None
+):
+    select = SELECTION_STRATEGIES[selection] if isinstance(selection, str) else selection
+    if seed is not None:
+        random.seed(seed)
+
+    start = time.time()
+
+    cell_domains = None
+    if use_propagation:
+        cell_domains, pruned = propagate(cages, n)
+        if is_consistent(cell_domains, pruned):
+            board = solved_board(cell_domains)
+            if board is not None: # propagation alone solved it
+                return board, 0, time.time()-start, 0
+        else:
+            cell_domains = None # contradiction, fall back to the raw cage combinations
+    allowed = allowed_values(cages, n, cell_domains)
+
+    population = [[random_row(r, n, allowed) for r in range(n)] for _ in range(pop_size)]
+
+    situational = None
+    situational_fit = None
+    normative = [[] for _ in range(n)] # rows of the elites, per row index
+
+    prev_best = 99999
+    stagnation = 0
+    deadline = start + time_limit if time_limit is not None else None
+    best_ever = (99999, None)
+    gen = 0
+
+    for gen in range(generations):
+        if should_stop():
+            break
+        if deadline is not None and time.time() >= deadline:
+            break
+
+        scored = [(permutation_fitness(indiv, cages, n), indiv) for indiv in population]
+        best_fit, best_indiv = min(scored, key=lambda x: x[0])
+        if best_fit < best_ever[0]:
+            best_ever = (best_fit, [row[:] for row in best_indiv])
+
+        if gui_callback and gen % update_interval == 0:
+            gui_callback(best_indiv, best_fit, gen)
+
+        if best_fit == 0:
+            return [row[:] for row in best_indiv], 0, time.time()-start, gen
+
+        if situational is None or best_fit < situational_fit:
+            situational = [row[:] for row in best_indiv]
+            situational_fit = best_fit
+
+        if best_fit == prev_best:
+            stagnation += 1
+        else:
+            stagnation = 0
+        prev_best = best_fit
+
+        elite_count = max(2, int(pop_size * acceptance_ratio))
+        elites, pick_parent = select(scored, elite_count)
+        normative = [[ind[r] for ind in elites] for r in range(n)]
+
+        new_pop = []
+        while len(new_pop) < pop_size:
+            p1 = situational
+            p2 = pick_parent()
+            p3 = pick_parent()
+
+            # whole rows from the three parents
+            child = []
+            for r in range(n):
+                choice = random.random()
+                parent = p1 if choice < 0.33 else p2 if choice < 0.66 else p3
+                child.append(parent[r][:])
+
+            # swap mutation inside rows
+            col_dups = None
+            for r in range(n):
+                if random.random() < mutation_rate:
+                    if col_dups is None:
+                        col_dups = [len({row[c] for row in child}) < n for c in range(n)]
+                    biased_swap(child, r, allowed, col_dups)
+
+            # normative influence: a row some elite uses
+            for r in range(n):
+                if random.random() < 0.05:
+                    child[r] = random.choice(normative[r])[:]
+
+            new_pop.append(child)
+
+        # stuck: whole rows only move together, so a local optimum holds the population
+        # for good. start over from fresh rows, best_ever keeps the result so far
+        if stagnation > 60:
+            new_pop = [[random_row(r, n, allowed) for r in range(n)] for _ in range(pop_size)]
+            situational = None
+            stagnation = 0
+
+        population = new_pop
+
+    else:
+        gen = generations
+
+    best_fit, best_grid = best_ever
+    if best_grid is None:
+        best_grid = population[0]
+        best_fit = permutation_fitness(best_grid, cages, n)
+    return best_grid, best_fit, time.time()-start, gen
@@ -0,0 +1,112 @@
+# presolve.py - speculative solving of the puzzle the GUI is looking at
+#
+# as soon as a puzzle is loaded (or highlighted in the dropdown) it is solved in a
+# low-priority worker process, so "Solve" can show the cached result right away or wait
+# for the running job instead of starting cold. a new selection cancels the running
+# job: at most one speculative solve uses the CPU at a time.
+#
+#   presolver.start("ca", cages, n)        # nothing happens if cached or already running
+#   presolver.result("ca", cages, n)       # (sol, fit, t, gen) or None
+#   presolver.running("ca", cages, n)      # True while that job is still solving
+
+import multiprocessing as mp
+import os
+from collections import OrderedDict
+
+from src import core
+from src.utils import puzzle_hash
+
+CACHE_SIZE = 16  # solved puzzles kept, least recently used go first
+NICENESS = 10  # worker priority on systems with os.nice
+
+
+def _solve(algorithm, cages, n):
+    # src.core loads only the solver that is used, so a spawned worker stays light
+    if algorithm == "ca":
+        return core.cultural_algorithm(cages, n)
+    if algorithm == "auto":
+        return core.solve_auto(cages, n)
+    raise ValueError(f"no pre-solver for {algorithm!r}")
+
+
+# worker process: solve once, send ("ok", result) or ("error", message) back
+def _run(conn, algorithm, cages, n):
+    if hasattr(os, "nice"):
+        try:
+            os.nice(NICENESS)
+        except OSError:
+            pass
+    try:
+        conn.send(("ok", _solve(algorithm, cages, n)))
+    except Exception as e:
+        conn.send(("error", str(e)))
+    conn.close()
+
+
+class PreSolver:
+    def __init__(self, cache_size=CACHE_SIZE):
+        self.cache_size = cache_size
+        self.cache = OrderedDict()  # (algorithm, puzzle hash) -> solver result
+        self.job = None  # (key, process, connection) of the running solve
+
+    def key(self, algorithm, cages, n):
+        return algorithm, puzzle_hash(cages, n)
+
+    # solve in the background unless the result is cached or already on its way;
+    # any other running job is cancelled
+    def start(self, algorithm, cages, n):
+        key = self.key(algorithm, cages, n)
+        self.poll()
+        if key in self.cache:
+            self.cache.move_to_end(key)
+            return
+        if self.job is not None and self.job[0] == key:
+            return
+        self.cancel()
+        recv, send = mp.Pipe(duplex=False)
+        proc = mp.Process(target=_run, args=(send, algorithm, cages, n), daemon=True)
+        proc.start()
+        send.close()
+        self.job = (key, proc, recv)
+
+    # collect the running job if it has finished; a failed job is dropped so that
+    # "Solve" runs it again in the foreground and shows the error
+    def poll(self):
+        if self.job is None:
+            return
+        key, proc, conn = self.job
+        if not conn.poll() and proc.is_alive():
+            return
+        msg = None
+        if conn.poll():
+            try:
+                msg = conn.recv()
+            except EOFError:
+                pass
+        conn.close()
+        proc.join()
+        self.job = None
+        if msg is not None and msg[0] == "ok":
+            self.cache[key] = msg[1]
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+
+    def result(self, algorithm, cages, n):
+        self.poll()
+        key = self.key(algorithm, cages, n)
+        if key in self.cache:
+            self.cache.move_to_end(key)
+        return self.cache.get(key)
+
+    def running(self, algorithm, cages, n):
+        self.poll()
+        return self.job is not None and self.job[0] == self.key(algorithm, cages, n)
+
+    def cancel(self):
+        if self.job is None:
+            return
+        _, proc, conn = self.job
+        self.job = None
+        proc.terminate()
+        proc.join()
+        conn.close()
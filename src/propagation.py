@@ -0,0 +1,155 @@
+# propagation.py - constraint propagation run before any search
+#
+# shrinks the candidate values of every cell and the combinations of every cage
+# until nothing changes any more (fixpoint):
+#   - cage consistency (GAC): a combination survives only if each of its values is
+#     still a candidate of its cell, and a cell keeps only values some combination uses
+#   - naked singles: a cell with one candidate removes it from its row and column
+#   - hidden singles: a value with only one possible cell in a row/column goes there
+#   - cage in a line: values every combination puts into a row (or column) are
+#     removed from the rest of that row (or column)
+#
+# easy puzzles come out fully solved, the rest start the search from much smaller domains.
+
+from functools import lru_cache
+
+from src.cages import COMBINATION_CACHE, combination_table
+
+
+# two cells that would clash if they got the same value
+def same_line(a, b):
+    return a[0] == b[0] or a[1] == b[1]
+
+
+# combinations of one cage, without the ones repeating a value inside a row or column of the cage
+def cage_domain(cells, target, op, n):
+    clash = tuple((i, j) for i in range(len(cells)) for j in range(i+1, len(cells))
+                  if same_line(cells[i], cells[j]))
+    return list(_domain_table(clash, len(cells), target, op, n))
+
+
+# cached like combination_table, keyed by which cage cells share a line
+@lru_cache(maxsize=COMBINATION_CACHE)
+def _domain_table(clash, k, target, op, n):
+    return tuple(combo for combo in combination_table(k, target, op, n)
+                 if all(combo[i] != combo[j] for i, j in clash))
+
+
+# returns (cell_domains, cage_domains):
+#   cell_domains[r][c] is the set of values still possible for that cell
+#   cage_domains[i] is the list of combinations (tuples, in cage cell order) left for cage i
+# an empty set or list anywhere means the puzzle has no solution
+def propagate(cages, n, cell_domains=None, cage_domains=None):
+    if cell_domains is None:
+        cell_domains = [[set(range(1, n+1)) for _ in range(n)] for _ in range(n)]
+    else:
+        cell_domains = [[set(d) for d in row] for row in cell_domains]
+    if cage_domains is None:
+        cage_domains = [cage_domain(cells, target, op, n) for cells, target, op in cages]
+    else:
+        cage_domains = [list(d) for d in cage_domains]
+
+    lines = [[(r, c) for c in range(n)] for r in range(n)] + \
+            [[(r, c) for r in range(n)] for c in range(n)]
+
+    # for each cage, its cells grouped by the rows and columns they lie in
+    cage_lines = []
+    for cells, _, _ in cages:
+        groups = {}
+        for p, (r, c) in enumerate(cells):
+            groups.setdefault(("r", r), []).append(p)
+            groups.setdefault(("c", c), []).append(p)
+        cage_lines.append(groups)
+
+    def remove(r, c, values):
+        d = cell_domains[r][c]
+        if d & values:
+            d -= values
+            return True
+        return False
+
+    changed = True
+    while changed:
+        changed = False
+
+        # cage consistency in both directions
+        for i, (cells, _, _) in enumerate(cages):
+            doms = [cell_domains[r][c] for r, c in cells]
+            kept = [combo for combo in cage_domains[i]
+                    if all(v in d for v, d in zip(combo, doms))]
+            if len(kept) != len(cage_domains[i]):
+                cage_domains[i] = kept
+                changed = True
+            if not kept:
+                return cell_domains, cage_domains
+            for p, (r, c) in enumerate(cells):
+                support = {combo[p] for combo in kept}
+                if cell_domains[r][c] - support:
+                    cell_domains[r][c] &= support
+                    changed = True
+
+        # naked singles
+        for r in range(n):
+            for c in range(n):
+                d = cell_domains[r][c]
+                if not d:
+                    return cell_domains, cage_domains
+                if len(d) == 1:
+                    for k in range(n):
+                        if k != c and remove(r, k, d):
+                            changed = True
+                        if k != r and remove(k, c, d):
+                            changed = True
+
+        # hidden singles
+        for line in lines:
+            for v in range(1, n+1):
+                spots = [(r, c) for r, c in line if v in cell_domains[r][c]]
+                if not spots: # v fits nowhere in this line: empty a cell so is_consistent sees it
+                    r, c = line[0]
+                    cell_domains[r][c] = set()
+                    return cell_domains, cage_domains
+                if len(spots) == 1:
+                    r, c = spots[0]
+                    if len(cell_domains[r][c]) > 1:
+                        cell_domains[r][c] = {v}
+                        changed = True
+
+        # values a cage is forced to place in a row/column
+        for i, (cells, _, _) in enumerate(cages):
+            if not cage_domains[i]:
+                return cell_domains, cage_domains
+            for (kind, idx), positions in cage_lines[i].items():
+                forced = None
+                for combo in cage_domains[i]:
+                    vals = {combo[p] for p in positions}
+                    forced = vals if forced is None else forced & vals
+                    if not forced:
+                        break
+                if not forced:
+                    continue
+                inside = {cells[p] for p in positions}
+                for k in range(n):
+                    cell = (idx, k) if kind == "r" else (k, idx)
+                    if cell not in inside and remove(cell[0], cell[1], forced):
+                        changed = True
+
+    return cell_domains, cage_domains
+
+
+# False when some cell or cage has nothing left
+def is_consistent(cell_domains, cage_domains):
+    return all(d for row in cell_domains for d in row) and all(cage_domains)
+
+
+# the finished board when propagation alone fixed every cell, otherwise None.
+# a board repeating a value in a row or column is not a solution either
+def solved_board(cell_domains):
+    if not all(len(d) == 1 for row in cell_domains for d in row):
+        return None
+    board = [[next(iter(d)) for d in row] for row in cell_domains]
+    n = len(board)
+    if any(len(set(row)) != n for row in board) or \
+       any(len({board[r][c] for r in range(n)}) != n for c in range(n)):
+        return None
+    return board
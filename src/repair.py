@@ -0,0 +1,132 @@
+# repair.py - deterministic Latin repair for the cultural algorithm
+#
+# repair_latin (algorithm1) drops random missing values into duplicate positions, first
+# for rows, then for columns, which breaks rows and cages again. here every row and then
+# every column is fixed by a minimum cost assignment of the values it needs to the
+# cells holding duplicates:
+#   - keeping a cell's original (genotype) value is free, changing it costs 1
+#   - a value that leaves the cell's cage violated costs CAGE_COST more
+#   - in the column pass, a value that repeats inside its row costs ROW_COST more
+# the result depends only on the grid, so repaired grids are cached.
+
+from collections import Counter, OrderedDict
+from itertools import permutations
+
+from src.cages import cage_valid
+
+CAGE_COST = 3
+ROW_COST = 4
+CACHE_SIZE = 20000
+BRUTE_FORCE_MAX = 4  # up to this many cells trying every permutation beats the Hungarian method
+
+
+# minimum cost assignment on a square cost matrix, returns assign[i] = column given to row i.
+# Hungarian algorithm, small matrices are simply enumerated (first minimum wins on ties)
+def min_cost_assignment(cost):
+    k = len(cost)
+    if k <= BRUTE_FORCE_MAX:
+        return list(min(permutations(range(k)),
+                        key=lambda perm: sum(row[j] for row, j in zip(cost, perm))))
+    INF = float("inf")
+    u = [0] * (k + 1)
+    v = [0] * (k + 1)
+    p = [0] * (k + 1)  # p[j] = row matched to column j (1-based, 0 = free)
+    way = [0] * (k + 1)
+    for i in range(1, k + 1):
+        p[0] = i
+        j0 = 0
+        minv = [INF] * (k + 1)
+        used = [False] * (k + 1)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            delta = INF
+            j1 = 0
+            for j in range(1, k + 1):
+                if not used[j]:
+                    cur = cost[i0-1][j-1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j] = cur
+                        way[j] = j0
+                    if minv[j] < delta:
+                        delta = minv[j]
+                        j1 = j
+            for j in range(k + 1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j] -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+
+    assign = [0] * k
+    for j in range(1, k + 1):
+        if p[j]:
+            assign[p[j]-1] = j - 1
+    return assign
+
+
+# callable like repair_latin(grid, n, rng); one instance per puzzle.
+# a plain class (not a closure) so it can be sent to the parallel scoring workers
+class AssignmentRepair:
+    def __init__(self, cages, n, cache_size=CACHE_SIZE):
+        self.cages = cages
+        self.n = n
+        self.cage_of = {cell: i for i, (cells, _, _) in enumerate(cages) for cell in cells}
+        self.cache_size = cache_size
+        self.cache = OrderedDict()
+
+    def __call__(self, grid, n, rng=None):
+        key = tuple(tuple(row) for row in grid)
+        hit = self.cache.get(key)
+        if hit is not None:
+            self.cache.move_to_end(key)
+            return [list(row) for row in hit]
+
+        g = [list(row) for row in grid]
+        for r in range(n):
+            self._fix_line(g, key, [(r, c) for c in range(n)], False)
+        for c in range(n):
+            self._fix_line(g, key, [(r, c) for r in range(n)], True)
+
+        self.cache[key] = tuple(tuple(row) for row in g)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return g
+
+    def _fix_line(self, g, orig, line, column_pass):
+        vals = [g[r][c] for r, c in line]
+        counts = Counter(vals)
+        dups = [k for k, v in enumerate(vals) if counts[v] > 1]
+        if not dups:
+            return
+        # one of each repeated value plus the missing ones: exactly len(dups) values
+        values = sorted(v for v in counts if counts[v] > 1) + \
+                 [v for v in range(1, self.n + 1) if v not in counts]
+        cost = []
+        for k in dups:
+            r, c = line[k]
+            cells, target, op = self.cages[self.cage_of[(r, c)]]
+            p = cells.index((r, c))
+            others = [g[x][y] for x, y in cells]
+            in_row = Counter(g[r]) if column_pass else None
+            costs = []
+            for v in values:
+                others[p] = v
+                cc = 0 if orig[r][c] == v else 1
+                if not cage_valid(others, target, op):
+                    cc += CAGE_COST
+                if column_pass and in_row[v] - (g[r][c] == v) > 0:
+                    cc += ROW_COST
+                costs.append(cc)
+            cost.append(costs)
+
+        for k, j in zip(dups, min_cost_assignment(cost)):
+            r, c = line[k]
+            g[r][c] = values[j]
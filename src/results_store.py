@@ -0,0 +1,180 @@
+# results_store.py - append-only JSONL store for solver runs
+#
+# every run is one json object on its own line, so files can be appended to by
+# many runs, concatenated, and read back line by line without loading it all.
+#
+#   python -m src.results_store summary "saved results/runs.jsonl"
+#   python -m src.results_store summary runs.jsonl --by solver --field steps
+
+import argparse
+import json
+import os
+import statistics
+import time
+from datetime import datetime
+
+from src.utils import puzzle_hash
+from src.verify import verify_solution
+
+DEFAULT_PATH = os.path.join("saved results", "runs.jsonl")
+
+
+# one run of one solver on one puzzle, fields that do not apply stay None.
+# the cages are kept too so a record can be re-run or turned into features later
+def make_record(cages, n, solver, time_taken, solution=None, params=None, seed=None,
+                steps=None, generations=None, fitness=None, solved=None, puzzle_name=None):
+    if solved is None: # checked against the puzzle, not taken from the solver's own fitness
+        solved = not verify_solution(cages, n, solution)
+    return {
+        "ts": datetime.now().isoformat(timespec="seconds"),
+        "puzzle": puzzle_hash(cages, n),
+        "puzzle_name": puzzle_name,
+        "n": n,
+        "solver": solver,
+        "params": params or {},
+        "seed": seed,
+        "time": time_taken,
+        "steps": steps,
+        "generations": generations,
+        "fitness": fitness,
+        "solved": bool(solved),
+        "solution": solution,
+        "cages": [[[list(cell) for cell in cells], target, op] for cells, target, op in cages],
+    }
+
+
+class ResultsStore:
+    # records are buffered and written batch_size at a time (or on flush/close)
+    def __init__(self, path=DEFAULT_PATH, batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self.buffer = []
+
+    def append(self, record):
+        self.buffer.append(record)
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def extend(self, records):
+        for rec in records:
+            self.append(rec)
+
+    def flush(self):
+        if not self.buffer:
+            return
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        lines = "".join(json.dumps(rec, separators=(",", ":")) + "\n" for rec in self.buffer)
+        # one write call per batch keeps lines from different processes whole
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        self.buffer = []
+
+    def close(self):
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# cages of a stored record in the same form as utils.PUZZLES, None for old records
+def record_cages(rec):
+    raw = rec.get("cages")
+    if not raw:
+        return None
+    return [([tuple(cell) for cell in cells], target, op) for cells, target, op in raw]
+
+
+# read records back, a half-written last line (crashed run) is skipped
+def read_records(path=DEFAULT_PATH, **filters):
+    if not os.path.exists(path):
+        return
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if all(rec.get(k) == v for k, v in filters.items()):
+                yield rec
+
+
+# group records by the `by` fields and summarise one numeric field per group
+def aggregate(records, by=("solver", "n"), field="time", solved_only=False):
+    groups = {}
+    for rec in records:
+        if solved_only and not rec.get("solved"):
+            continue
+        val = rec.get(field)
+        if val is None:
+            continue
+        groups.setdefault(tuple(rec.get(k) for k in by), []).append(val)
+
+    summary = []
+    for key in sorted(groups, key=lambda k: tuple(str(x) for x in k)):
+        vals = groups[key]
+        summary.append({
+            **dict(zip(by, key)),
+            "runs": len(vals),
+            "median": statistics.median(vals),
+            "mean": statistics.fmean(vals),
+            "min": min(vals),
+            "max": max(vals),
+        })
+    return summary
+
+
+def print_summary(rows, field):
+    if not rows:
+        print("no matching records")
+        return
+    keys = [k for k in rows[0] if k not in ("runs", "median", "mean", "min", "max")]
+    header = keys + ["runs", f"median {field}", "mean", "min", "max"]
+    print("  ".join(f"{h:>22}" for h in header))
+    for row in rows:
+        cells = [str(row[k]) for k in keys] + [str(row["runs"])]
+        cells += [f"{row[k]:.6g}" for k in ("median", "mean", "min", "max")]
+        print("  ".join(f"{c:>22}" for c in cells))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Query the solver results store")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("summary", help="median/mean per group")
+    s.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    s.add_argument("--by", default="solver,n", help="comma separated record fields")
+    s.add_argument("--field", default="time")
+    s.add_argument("--solved-only", action="store_true")
+    s.add_argument("--solver")
+    s.add_argument("--puzzle", help="puzzle hash")
+
+    c = sub.add_parser("count", help="number of stored runs")
+    c.add_argument("path", nargs="?", default=DEFAULT_PATH)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "count":
+        print(sum(1 for _ in read_records(args.path)))
+        return
+
+    filters = {}
+    if args.solver:
+        filters["solver"] = args.solver
+    if args.puzzle:
+        filters["puzzle"] = args.puzzle
+    t0 = time.perf_counter()
+    rows = aggregate(read_records(args.path, **filters), tuple(args.by.split(",")),
+                     args.field, args.solved_only)
+    print_summary(rows, args.field)
+    print(f"({time.perf_counter() - t0:.3f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+# selector.py - picks the solver expected to be fastest for a given puzzle
+#
+# cheap features are taken from the cage list and a k-nearest-neighbour model, trained
+# on runs from the results store, predicts the (log) solve time of every solver variant
+# seen in training. the variant with the lowest prediction wins.
+#
+#   python -m src.benchmark --solvers ca,bt,cage_bt,cbj_bt --repeats 3
+#   python -m src.selector train "saved results/runs.jsonl"
+#   python -m src.selector predict "7x7 Puzzle"
+
+import argparse
+import json
+import math
+import os
+
+from src.utils import PUZZLES, puzzle_size
+from src.cages import generate_cage_combinations
+from src.results_store import DEFAULT_PATH, read_records, record_cages
+from src.benchmark import SOLVERS
+
+MODEL_PATH = os.path.join("saved results", "selector.json")
+DEFAULT_CHOICE = ("cage_bt", "cage_bt", {})  # (label, solver, params) used without a model
+UNSOLVED_PENALTY = 10.0  # an unsolved run counts as this many times its time
+K_NEIGHBOURS = 3
+
+OPS = ("+", "-", "*", "/", "=")
+FEATURE_NAMES = (
+    ["n", "cages", "mean_cage_size", "max_cage_size"]
+    + [f"size_{k}" for k in (1, 2, 3)] + ["size_4plus"]
+    + [f"op_{op}" for op in OPS]
+    + ["log_domain_total", "log_domain_max"]
+)
+
+
+# feature vector of a puzzle, in FEATURE_NAMES order
+def extract_features(cages, n):
+    sizes = [len(cells) for cells, _, _ in cages]
+    hist = [0, 0, 0, 0]
+    for k in sizes:
+        hist[min(k, 4) - 1] += 1
+    ops = [sum(1 for _, _, op in cages if op == o) for o in OPS]
+    logs = [math.log(max(1, len(generate_cage_combinations(cells, target, op, n))))
+            for cells, target, op in cages]
+    return [n, len(cages), sum(sizes) / len(sizes), max(sizes)] + hist + ops + \
+           [sum(logs), max(logs)]
+
+
+class SolverSelector:
+    def __init__(self, k=K_NEIGHBOURS):
+        self.k = k
+        self.variants = {}  # label -> {"solver", "params", "samples": [[features, log time], ...]}
+        self.scale = None   # (mean, std) per feature, for distances
+
+    # learn from results store records; every solver label + parameter set is one candidate
+    def fit(self, records):
+        self.variants = {}
+        features = {}  # puzzle hash -> features, puzzles repeat a lot in benchmark logs
+        for rec in records:
+            cages = record_cages(rec)
+            label = rec.get("solver")
+            base = (label or "").split(":")[0]
+            if cages is None or base not in SOLVERS or not rec.get("time"):
+                continue
+            params = rec.get("params") or {}
+            if params and ":" not in label:
+                label = f"{label} {json.dumps(params, sort_keys=True)}"
+            t = rec["time"] * (1 if rec.get("solved") else UNSOLVED_PENALTY)
+            var = self.variants.setdefault(label, {"solver": base, "params": params,
+                                                   "samples": []})
+            if rec["puzzle"] not in features:
+                features[rec["puzzle"]] = extract_features(cages, rec["n"])
+            var["samples"].append([features[rec["puzzle"]], math.log(max(t, 1e-6))])
+
+        feats = [f for var in self.variants.values() for f, _ in var["samples"]]
+        if feats:
+            cols = list(zip(*feats))
+            mean = [sum(c) / len(c) for c in cols]
+            std = [math.sqrt(sum((x - m) ** 2 for x in c) / len(c)) or 1.0
+                   for c, m in zip(cols, mean)]
+            self.scale = (mean, std)
+        return self
+
+    def _distance(self, a, b):
+        mean, std = self.scale
+        return math.sqrt(sum(((x - y) / s) ** 2 for x, y, s in zip(a, b, std)))
+
+    # expected solve time (seconds) of every known variant
+    def predict_times(self, cages, n):
+        if not self.variants:
+            return {}
+        f = extract_features(cages, n)
+        out = {}
+        for label, var in self.variants.items():
+            near = sorted(var["samples"], key=lambda s: self._distance(f, s[0]))[:self.k]
+            weights = [1.0 / (1e-3 + self._distance(f, s[0])) for s in near]
+            logt = sum(w * s[1] for w, s in zip(weights, near)) / sum(weights)
+            out[label] = math.exp(logt)
+        return out
+
+    # (label, solver, params, expected time or None)
+    def choose(self, cages, n):
+        times = self.predict_times(cages, n)
+        if not times:
+            return DEFAULT_CHOICE + (None,)
+        label = min(times, key=times.get)
+        var = self.variants[label]
+        return label, var["solver"], var["params"], times[label]
+
+    def save(self, path=MODEL_PATH):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"k": self.k, "scale": self.scale, "variants": self.variants}, f)
+
+    @classmethod
+    def load(cls, path=MODEL_PATH):
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        sel = cls(data.get("k", K_NEIGHBOURS))
+        sel.scale = data.get("scale")
+        sel.variants = data.get("variants", {})
+        return sel
+
+
+_default_selector = None
+
+
+# the trained model from MODEL_PATH, or an empty one (always DEFAULT_CHOICE)
+def default_selector():
+    global _default_selector
+    if _default_selector is None:
+        if os.path.exists(MODEL_PATH):
+            _default_selector = SolverSelector.load(MODEL_PATH)
+        else:
+            _default_selector = SolverSelector()
+    return _default_selector
+
+
+# headless entry point: route the puzzle to the predicted fastest solver and run it.
+# returns (board, info) where info holds the choice, the prediction and the run's metrics
+def solve_auto(cages, n=None, time_limit=None, selector=None, seed=None, should_stop=None):
+    if n is None:
+        n = puzzle_size(cages)
+    selector = selector or default_selector()
+    label, solver, params, expected = selector.choose(cages, n)
+    extra = {"should_stop": should_stop} if should_stop is not None else {}
+    out = SOLVERS[solver](cages, n, seed=seed, time_limit=time_limit, **params, **extra)
+    info = {
+        "solver": label,
+        "params": params,
+        "predicted_time": expected,
+        "time": out["time_taken"],
+        "steps": out.get("steps"),
+        "generations": out.get("generations"),
+        "fitness": out.get("fitness"),
+    }
+    return out["solution"], info
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Train or query the solver selector")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+
+    t = sub.add_parser("train", help="fit the model on a results store")
+    t.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    t.add_argument("--out", default=MODEL_PATH)
+    t.add_argument("--k", type=int, default=K_NEIGHBOURS)
+
+    p = sub.add_parser("predict", help="predicted time per solver for a stored puzzle")
+    p.add_argument("puzzle", choices=sorted(PUZZLES))
+    p.add_argument("--model", default=MODEL_PATH)
+
+    args = ap.parse_args(argv)
+    if args.cmd == "train":
+        sel = SolverSelector(args.k).fit(read_records(args.path))
+        sel.save(args.out)
+        runs = sum(len(v["samples"]) for v in sel.variants.values())
+        print(f"trained on {runs} runs of {len(sel.variants)} solver variants -> {args.out}")
+        return
+
+    sel = SolverSelector.load(args.model) if os.path.exists(args.model) else SolverSelector()
+    cages = PUZZLES[args.puzzle]
+    n = puzzle_size(cages)
+    for label, t in sorted(sel.predict_times(cages, n).items(), key=lambda x: x[1]):
+        print(f"{label:>24}  {t:.6f}s")
+    print("choice:", sel.choose(cages, n)[0])
+
+
+if __name__ == "__main__":
+    main()
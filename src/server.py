@@ -0,0 +1,417 @@
+# server.py - local HTTP/JSON solving service built on asyncio
+#
+# run with:  python -m src.server --port 8765
+#
+#   POST /solve   {"cages": [[[[0,0],[0,1]], 3, "+"], ...], "algorithm": "bt", "timeout": 5}
+#   GET  /stats   queue depth, in-flight jobs and latency percentiles
+#   GET  /health
+#
+# solving happens in a bounded process pool so the event loop never blocks.
+# identical puzzles that are in flight at the same time share one computation, and when
+# every client waiting for it hangs up the job is dropped from the queue or, once it is
+# running, told to stop through a shared event.
+
+import argparse
+import asyncio
+import json
+import multiprocessing as mp
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from src.core import (puzzle_hash, puzzle_size, cultural_algorithm, backtracking_solve,
+                      cage_backtracking_solve, fill_ratio, solve_auto, verify_solution)
+
+ALGORITHMS = ("ca", "bt", "cage_bt", "auto")
+# accepted CA params: name -> (type, smallest, largest value)
+CA_PARAMS = {
+    "pop_size": (int, 2, 10000),
+    "generations": (int, 1, 10**7),
+    "mutation_rate": (float, 0.0, 1.0),
+    "acceptance_ratio": (float, 0.0, 1.0),
+}
+MAX_BODY = 1 << 20  # 1 MB is plenty for any cage list
+LATENCY_WINDOW = 1000  # number of recent requests used for the percentiles
+DEADLINE_GRACE = 1.0  # extra seconds allowed for a worker to hand back its best-so-far result
+
+HTTP_REASONS = {
+    200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+    413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable", 504: "Gateway Timeout",
+}
+
+
+class RequestError(Exception): # bad input from the client, becomes an http error
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+# runs inside a worker process, so it must stay a plain top level function
+# `deadline` is an absolute time.time() value, so time spent waiting in the queue counts too.
+# when it hits, or `stop` (a manager Event) is set, the solvers give back their best
+# partial result instead of running on
+def solve_job(cages, n, algorithm, params, deadline=None, stop=None):
+    time_limit = max(0.0, deadline - time.time()) if deadline is not None else None
+    should_stop = stop.is_set if stop is not None else None
+    if algorithm == "ca":
+        if should_stop is not None:
+            params = dict(params, should_stop=should_stop)
+        grid, fit, t, gens = cultural_algorithm(cages, n, time_limit=time_limit, **params)
+        return {"solution": grid, "solved": not verify_solution(cages, n, grid), "fitness": fit,
+                "time": t, "generations": gens}
+
+    if algorithm == "auto":
+        board, info = solve_auto(cages, n, time_limit=time_limit, should_stop=should_stop)
+        ratio = fill_ratio(board)
+        return dict(info, solution=board, solved=not verify_solution(cages, n, board), fill_ratio=ratio, chosen=info["solver"])
+
+    if algorithm == "cage_bt":
+        board, steps, t = cage_backtracking_solve(cages, n, time_limit=time_limit,
+                                                  should_stop=should_stop)
+    else:
+        board, steps, t = backtracking_solve(cages, n, time_limit=time_limit,
+                                             should_stop=should_stop)
+    ratio = fill_ratio(board)
+    return {"solution": board, "solved": not verify_solution(cages, n, board), "fill_ratio": ratio,
+            "steps": steps, "time": t}
+
+
+# a json number (true/false and strings are not)
+def _number(value):
+    if isinstance(value, bool) or not isinstance(value, (int, float)):
+        raise TypeError(f"not a number: {value!r}")
+    return value
+
+
+# a json number that holds a whole value (1.0 is fine, 1.5 and 1e400 are not)
+def _whole(value):
+    if isinstance(_number(value), float) and not value.is_integer():
+        raise ValueError(f"not an integer: {value!r}")
+    return int(value)
+
+
+# turn the json cage list into the same tuples used in utils.PUZZLES
+def parse_cages(raw):
+    if not isinstance(raw, list) or not raw:
+        raise RequestError(400, "'cages' must be a non-empty list")
+    cages = []
+    for cage in raw:
+        try:
+            cells, target, op = cage
+            cells = [(_whole(r), _whole(c)) for r, c in cells]
+            target = _whole(target)
+        except (TypeError, ValueError):
+            raise RequestError(400, f"bad cage: {cage!r}")
+        # the same rules as editor.PuzzleEditor._check_op, the solvers rely on them
+        if op not in ("+", "-", "*", "/", "=") or not cells or target <= 0:
+            raise RequestError(400, f"bad cage: {cage!r}")
+        if (op == "=" and len(cells) != 1) or (op in ("-", "/") and len(cells) != 2):
+            raise RequestError(400, f"bad cage: '{op}' cage with {len(cells)} cells")
+        cages.append((cells, target, op))
+    return cages
+
+
+def parse_request(body):
+    try:
+        data = json.loads(body or b"{}")
+    except ValueError:
+        raise RequestError(400, "body is not valid json")
+    if not isinstance(data, dict):
+        raise RequestError(400, "body must be a json object")
+
+    cages = parse_cages(data.get("cages"))
+    try:
+        n = int(data.get("n") or puzzle_size(cages))
+    except (TypeError, ValueError):
+        raise RequestError(400, "'n' must be an integer")
+    if n != puzzle_size(cages):
+        raise RequestError(400, "'n' does not match the cages")
+    # count first: the full cell list is only built when it is as long as the cage cells
+    covered = sorted(cell for cells, _, _ in cages for cell in cells)
+    if len(covered) != n * n or covered != [(r, c) for r in range(n) for c in range(n)]:
+        raise RequestError(400, "cages must cover every cell of the board exactly once")
+
+    algorithm = data.get("algorithm", "bt")
+    if algorithm not in ALGORITHMS:
+        raise RequestError(400, f"'algorithm' must be one of {ALGORITHMS}")
+
+    params = data.get("params") or {}
+    if not isinstance(params, dict):
+        raise RequestError(400, "'params' must be a json object")
+    if algorithm != "ca":
+        params = {}
+    else:
+        unknown = set(params) - set(CA_PARAMS)
+        if unknown:
+            raise RequestError(400, f"unknown params: {sorted(unknown)}")
+        params = dict(params)
+        for name, value in params.items():
+            kind, lo, hi = CA_PARAMS[name]
+            try:
+                value = _whole(value) if kind is int else float(_number(value))
+            except (TypeError, ValueError):
+                raise RequestError(400, f"param {name!r} must be {'an integer' if kind is int else 'a number'}")
+            if not lo <= value <= hi:
+                raise RequestError(400, f"param {name!r} must be between {lo} and {hi}")
+            params[name] = value
+
+    timeout = data.get("timeout")
+    if timeout is not None:
+        try:
+            timeout = float(timeout)
+        except (TypeError, ValueError):
+            raise RequestError(400, "'timeout' must be a number")
+        if timeout <= 0:
+            raise RequestError(400, "'timeout' must be positive")
+
+    return cages, n, algorithm, params, timeout
+
+
+def percentile(sorted_vals, p): # nearest-rank percentile
+    if not sorted_vals:
+        return None
+    k = max(0, min(len(sorted_vals) - 1, int(round(p / 100 * len(sorted_vals) + 0.5)) - 1))
+    return sorted_vals[k]
+
+
+class SolverService:
+    def __init__(self, workers=2, max_queue=32, default_timeout=30.0):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self.executor = None
+        self.manager = None  # hands out the stop events of running jobs
+
+        self.inflight = {}  # job key -> [future, waiting clients, stop event, executor future]
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+        self.counters = {"requests": 0, "completed": 0, "coalesced": 0,
+                         "timeouts": 0, "cancelled": 0, "stopped": 0, "rejected": 0, "errors": 0}
+
+    def start(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            self.manager = mp.Manager()
+
+    def close(self):
+        if self.executor is not None:
+            for entry in self.inflight.values():
+                entry[2].set() # running jobs end now instead of holding the shutdown up
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+        if self.manager is not None:
+            self.manager.shutdown()
+            self.manager = None
+
+    # jobs that are submitted but not picked up by a worker yet
+    def queue_depth(self):
+        return max(0, len(self.inflight) - self.workers)
+
+    def stats(self):
+        lat = sorted(self.latencies)
+        return {
+            "queue_depth": self.queue_depth(),
+            "in_flight": len(self.inflight),
+            "workers": self.workers,
+            "max_queue": self.max_queue,
+            "latency": {
+                "count": len(lat),
+                "p50": percentile(lat, 50),
+                "p90": percentile(lat, 90),
+                "p99": percentile(lat, 99),
+                "max": lat[-1] if lat else None,
+            },
+            **self.counters,
+        }
+
+    # the first request for a puzzle sets the deadline of the shared computation
+    def _job(self, cages, n, algorithm, params, deadline):
+        key = (puzzle_hash(cages, n), algorithm, json.dumps(params, sort_keys=True))
+
+        entry = self.inflight.get(key)
+        if entry is not None:
+            entry[1] += 1
+            self.counters["coalesced"] += 1
+            return key, entry[0]
+
+        if len(self.inflight) >= self.workers + self.max_queue:
+            self.counters["rejected"] += 1
+            raise RequestError(503, "solver queue is full, try again later")
+
+        # the executor's own future, unlike the asyncio wrapper, knows if a worker has
+        # picked the job up, so it can tell a queued job (cancel) from a running one (stop)
+        stop = self.manager.Event()
+        job = self.executor.submit(solve_job, cages, n, algorithm, params, deadline, stop)
+        fut = asyncio.wrap_future(job)
+        self.inflight[key] = [fut, 1, stop, job]
+        fut.add_done_callback(lambda f: self._forget(key, f))
+        return key, fut
+
+    def _forget(self, key, fut):
+        entry = self.inflight.get(key)
+        if entry is not None and entry[0] is fut:
+            del self.inflight[key]
+
+    def _release(self, key, fut):
+        entry = self.inflight.get(key)
+        if entry is None or entry[0] is not fut:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            # nobody is waiting any more: drop a queued job, stop a running one so its
+            # worker is free again within DEADLINE_CHECK_MASK steps / one CA generation
+            if not entry[3].cancel():
+                entry[2].set()
+                self.counters["stopped"] += 1
+            self.inflight.pop(key, None)
+
+    # solve one request, `disconnected` resolves when the client goes away
+    async def solve(self, cages, n, algorithm, params, timeout=None, disconnected=None):
+        self.counters["requests"] += 1
+        start = time.perf_counter()
+        timeout = timeout or self.default_timeout
+
+        key, fut = self._job(cages, n, algorithm, params, time.time() + timeout)
+        waiter = asyncio.ensure_future(asyncio.shield(fut))
+        watch = [waiter] + ([disconnected] if disconnected is not None else [])
+
+        try:
+            # the solver stops itself at the deadline, the grace covers queueing and pickling
+            done, _ = await asyncio.wait(watch, timeout=timeout + DEADLINE_GRACE,
+                                         return_when=asyncio.FIRST_COMPLETED)
+            if waiter not in done:
+                waiter.cancel()
+                self._release(key, fut)
+                if done:
+                    self.counters["cancelled"] += 1
+                    return None
+                self.counters["timeouts"] += 1
+                raise RequestError(504, f"no result within {timeout:g}s")
+        except asyncio.CancelledError:
+            waiter.cancel()
+            self._release(key, fut)
+            self.counters["cancelled"] += 1
+            raise
+
+        try:
+            result = waiter.result()
+        except Exception as e:
+            self.counters["errors"] += 1
+            raise RequestError(500, f"solver failed: {e}")
+
+        latency = time.perf_counter() - start
+        self.latencies.append(latency)
+        self.counters["completed"] += 1
+        return dict(result, puzzle=key[0], algorithm=algorithm, latency=latency)
+
+
+# ---------------------------------------------------------------------------
+# minimal HTTP/1.0 handling, one request per connection
+
+async def read_request(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, path, _ = line.decode("latin-1").split(" ", 2)
+    except ValueError:
+        raise RequestError(400, "malformed request line")
+
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    length = int(headers.get("content-length") or 0)
+    if length > MAX_BODY:
+        raise RequestError(413, "request body too large")
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), path.split("?", 1)[0], body
+
+
+def write_response(writer, status, payload):
+    body = json.dumps(payload).encode()
+    head = (
+        f"HTTP/1.0 {status} {HTTP_REASONS.get(status, 'Error')}\r\n"
+        f"Content-Type: application/json\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        f"Connection: close\r\n\r\n"
+    )
+    writer.write(head.encode("latin-1") + body)
+
+
+async def handle_client(service, reader, writer):
+    try:
+        try:
+            req = await read_request(reader)
+            if req is None:
+                return
+            method, path, body = req
+
+            if path == "/health":
+                status, payload = 200, {"ok": True}
+            elif path == "/stats":
+                status, payload = 200, service.stats()
+            elif path == "/solve":
+                if method != "POST":
+                    raise RequestError(405, "use POST for /solve")
+                cages, n, algorithm, params, timeout = parse_request(body)
+
+                # the client has nothing more to send, so EOF here means it hung up
+                disconnected = asyncio.ensure_future(reader.read(1))
+                try:
+                    payload = await service.solve(cages, n, algorithm, params,
+                                                  timeout, disconnected)
+                finally:
+                    disconnected.cancel()
+                if payload is None:
+                    return
+                status = 200
+            else:
+                raise RequestError(404, f"no route for {path}")
+        except RequestError as e:
+            status, payload = e.status, {"error": e.message}
+        except (ValueError, TypeError, asyncio.IncompleteReadError) as e:
+            status, payload = 400, {"error": str(e)}
+
+        write_response(writer, status, payload)
+        await writer.drain()
+    except (ConnectionError, asyncio.CancelledError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve(host="127.0.0.1", port=8765, workers=2, max_queue=32, default_timeout=30.0):
+    service = SolverService(workers, max_queue, default_timeout)
+    service.start()
+    server = await asyncio.start_server(
+        lambda r, w: handle_client(service, r, w), host, port
+    )
+    print(f"KenKen solver service on http://{host}:{port} ({workers} workers)")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Local KenKen solving service")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8765)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--max-queue", type=int, default=32)
+    ap.add_argument("--timeout", type=float, default=30.0, help="default per-request deadline (s)")
+    args = ap.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.max_queue, args.timeout))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
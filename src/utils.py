@@ -1,5 +1,8 @@
 # utils.py — Puzzle definitions for KenKen Solver
 
+import hashlib
+import json
+
 PUZZLES = {
 
 
@@ -161,7 +164,52 @@ PUZZLES = {
     # 15#10-18-11#+
     ([(1,3),(2,4),(1,4)], 15, '+'),
 
-]
+],
+
+    "8x8 Puzzle": [ # generated from a random latin square, checked to have exactly one solution
+        ([(0,0),(1,0)], 3, '-'),
+        ([(0,1),(1,1)], 1, '-'),
+        ([(0,2),(1,2),(2,2),(2,3)], 128, '*'),
+        ([(0,3),(1,3)], 4, '-'),
+        ([(0,4),(0,5),(1,5)], 12, '+'),
+        ([(0,6),(1,6)], 8, '+'),
+        ([(0,7),(1,7)], 3, '/'),
+        ([(1,4),(2,4),(2,5)], 60, '*'),
+        ([(2,0),(2,1),(3,1)], 11, '+'),
+        ([(2,6),(2,7),(3,6)], 14, '+'),
+        ([(3,0),(4,0),(4,1),(4,2)], 14, '+'),
+        ([(3,2),(3,3)], 15, '*'),
+        ([(3,4),(4,4),(4,3)], 168, '*'),
+        ([(3,5),(4,5)], 2, '/'),
+        ([(3,7),(4,7),(5,7),(5,6)], 25, '+'),
+        ([(4,6)], 4, '='),
+        ([(5,0),(5,1)], 3, '/'),
+        ([(5,2),(6,2),(6,1)], 70, '*'),
+        ([(5,3),(6,3),(7,3),(5,4)], 17, '+'),
+        ([(5,5),(6,5),(6,4),(7,4)], 112, '*'),
+        ([(6,0)], 4, '='),
+        ([(6,6),(7,6),(7,5)], 16, '+'),
+        ([(6,7),(7,7)], 20, '*'),
+        ([(7,0),(7,1)], 21, '*'),
+        ([(7,2)], 6, '='),
+    ],
 
 
 }
+
+
+# size of the board (n for an n x n puzzle) worked out from the cage cells
+def puzzle_size(cages):
+    return max(max(max(r, c) for r, c in cells) for cells, _, _ in cages) + 1
+
+
+# stable short hash of a puzzle, the same cages in any order give the same key
+def puzzle_hash(cages, n=None):
+    if n is None:
+        n = puzzle_size(cages)
+    canon = sorted(
+        (sorted([int(r), int(c)] for r, c in cells), int(target), op)
+        for cells, target, op in cages
+    )
+    raw = json.dumps([n, canon], separators=(",", ":"))
+    return hashlib.sha1(raw.encode()).hexdigest()[:16]
@@ -0,0 +1,171 @@
+# verify.py - independent check of finished grids
+#
+# a puzzle is compiled once into index arrays (the cells of every cage, cages grouped by
+# operator and size), then any number of grids are checked against it:
+#   - every row and every column holds 1..n exactly once
+#   - every cage reaches its target with its operator
+# a failing grid gets the list of what it breaks: ("row", r), ("column", c), ("cage", i).
+#
+# a stack of grids is checked with a few NumPy array operations when NumPy is installed,
+# otherwise (and for single grids, where NumPy's overhead is not worth it) the same checks
+# run in plain Python. both paths give the same answers.
+#
+#   v = PuzzleVerifier(cages, n)
+#   ok, violations = v.check(grids)   # ok[k] per grid, violations[k] for the failing ones
+#   verify_solution(cages, n, grid)   # [] when the grid solves the puzzle
+#
+#   python -m src.verify "saved results/runs.jsonl"   # re-check every stored solution
+
+import argparse
+
+from src.cages import cage_valid
+
+NUMPY_MIN_BATCH = 8  # smaller stacks are checked faster in plain Python
+
+_np = None
+
+
+# NumPy is optional and only imported the first time a stack is checked with it
+def _numpy():
+    global _np
+    if _np is None:
+        try:
+            import numpy
+            _np = numpy
+        except ImportError:
+            _np = False
+    return _np
+
+
+class PuzzleVerifier:
+    def __init__(self, cages, n):
+        self.n = n
+        self.cages = [(tuple(r * n + c for r, c in cells), target, op)
+                      for cells, target, op in cages]
+        self.full = set(range(1, n+1))
+        self._groups = None  # NumPy index arrays, built on the first batch check
+
+    # out of range values (and 0 for an empty cell) already break their row, they are
+    # clamped so both paths see the same cage arithmetic
+    def _flat(self, grid):
+        hi = self.n + 1
+        return [min(max(int(v), 0), hi) for row in grid for v in row]
+
+    # what one grid breaks, [] when it solves the puzzle
+    def violations(self, grid):
+        n = self.n
+        g = self._flat(grid)
+        out = [("row", r) for r in range(n) if set(g[r*n:(r+1)*n]) != self.full]
+        out += [("column", c) for c in range(n) if set(g[c::n]) != self.full]
+        out += [("cage", i) for i, (idx, target, op) in enumerate(self.cages)
+                if not cage_valid([g[k] for k in idx], target, op)]
+        return out
+
+    # check a stack of grids (a list of n x n grids or an array of shape (B, n, n)).
+    # returns (ok, violations): ok[k] tells if grid k solves the puzzle (a NumPy bool array
+    # on the fast path) and violations maps the index of every failing grid to its list.
+    # use_numpy=None picks NumPy when it is installed and the stack is large enough
+    def check(self, grids, use_numpy=None):
+        if use_numpy is None:
+            use_numpy = len(grids) >= NUMPY_MIN_BATCH
+        np = _numpy() if use_numpy else False
+        if not np:
+            ok = []
+            violations = {}
+            for k, grid in enumerate(grids):
+                v = self.violations(grid)
+                ok.append(not v)
+                if v:
+                    violations[k] = v
+            return ok, violations
+        return self._check_numpy(np, grids)
+
+    def _compile(self, np):
+        by_shape = {}
+        for i, (idx, target, op) in enumerate(self.cages):
+            by_shape.setdefault((op, len(idx)), []).append((i, idx, target))
+        self._groups = [
+            (op, k, np.array([i for i, _, _ in group]),
+             np.array([idx for _, idx, _ in group]),
+             np.array([target for _, _, target in group], dtype=np.int64))
+            for (op, k), group in by_shape.items()
+        ]
+
+    def _check_numpy(self, np, grids):
+        n = self.n
+        if self._groups is None:
+            self._compile(np)
+        G = np.clip(np.asarray(grids, dtype=np.int64).reshape(-1, n * n), 0, n + 1)
+        B = len(G)
+
+        # a line holds 1..n exactly when the OR of 1 << value over it has bits 1..n set:
+        # n cells can only cover n values if no value repeats, 0 and n+1 set other bits
+        bits = np.left_shift(1, G).reshape(B, n, n)
+        full = (1 << (n + 1)) - 2
+        rows_ok = np.bitwise_or.reduce(bits, axis=2) == full
+        cols_ok = np.bitwise_or.reduce(bits, axis=1) == full
+
+        cages_ok = np.zeros((B, len(self.cages)), dtype=bool)
+        for op, k, ids, idx, targets in self._groups:
+            vals = G[:, idx]  # (B, cages in the group, cells per cage)
+            if op == '+':
+                res = vals.sum(axis=2) == targets
+            elif op == '*':
+                res = vals.prod(axis=2) == targets
+            elif op == '-' and k == 2:
+                res = np.abs(vals[:, :, 0] - vals[:, :, 1]) == targets
+            elif op == '/' and k == 2:
+                lo = vals.min(axis=2)
+                res = (lo > 0) & (vals.max(axis=2) == lo * targets)
+            elif op == '=':
+                res = vals[:, :, 0] == targets
+            else:
+                continue # an operator cage_valid never accepts
+            cages_ok[:, ids] = res
+
+        ok = rows_ok.all(axis=1) & cols_ok.all(axis=1) & cages_ok.all(axis=1)
+        violations = {}
+        for k in np.flatnonzero(~ok).tolist():
+            violations[k] = [("row", int(r)) for r in np.flatnonzero(~rows_ok[k])] + \
+                            [("column", int(c)) for c in np.flatnonzero(~cols_ok[k])] + \
+                            [("cage", int(i)) for i in np.flatnonzero(~cages_ok[k])]
+        return ok, violations
+
+
+# [] when grid solves the puzzle, otherwise what it breaks
+def verify_solution(cages, n, grid):
+    if grid is None:
+        return [("grid", None)]
+    return PuzzleVerifier(cages, n).violations(grid)
+
+
+# re-check the solutions in a results store, one batch per puzzle
+def main(argv=None):
+    from src.results_store import DEFAULT_PATH, read_records, record_cages  # it imports this module
+
+    ap = argparse.ArgumentParser(description="Check the stored solutions of a results store")
+    ap.add_argument("path", nargs="?", default=DEFAULT_PATH)
+    args = ap.parse_args(argv)
+
+    by_puzzle = {}
+    for rec in read_records(args.path):
+        cages = record_cages(rec)
+        if cages is not None and rec.get("solution") is not None:
+            by_puzzle.setdefault(rec["puzzle"], (cages, rec["n"], []))[2].append(rec)
+
+    total = valid = wrong_flag = 0
+    for cages, n, recs in by_puzzle.values():
+        ok, violations = PuzzleVerifier(cages, n).check([rec["solution"] for rec in recs])
+        for k, rec in enumerate(recs):
+            total += 1
+            valid += bool(ok[k])
+            if bool(rec.get("solved")) != bool(ok[k]):
+                wrong_flag += 1
+                print(f"{rec['puzzle']} {rec['solver']} {rec['ts']}: stored solved={rec.get('solved')}, "
+                      f"violations {violations.get(k, [])}")
+    print(f"{total} solutions in {len(by_puzzle)} puzzles: {valid} valid, "
+          f"{wrong_flag} with a wrong 'solved' flag")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import pytest
+
+from src.algorithm1 import cultural_algorithm
+from src.utils import PUZZLES, puzzle_size
+
+# solved within a few generations without propagation, so the scores seen on the way
+# include a graded 0.0 (which must not come back from the workers as an int)
+PUZZLE = PUZZLES["5x5 Easy #211767"]
+
+
+def run(fitness, repair, workers):
+    n = puzzle_size(PUZZLE)
+    scores = []  # best fitness of every generation, as the GUI gets it
+    result = cultural_algorithm(PUZZLE, n, pop_size=20, generations=10, seed=0, fitness=fitness,
+                                repair=repair, use_propagation=False, workers=workers,
+                                update_interval=1,
+                                gui_callback=lambda grid, fit, gen: scores.append((grid, fit, type(fit))))
+    return result, scores
+
+
+# scoring in worker processes must not change the run: same seed, same grids and fitness
+@pytest.mark.parametrize("fitness", ["binary", "graded"])
+@pytest.mark.parametrize("repair", ["random", "assignment"])
+def test_workers_match_serial(fitness, repair):
+    (grid, fit, _, gen), scores = run(fitness, repair, None)
+    (p_grid, p_fit, _, p_gen), p_scores = run(fitness, repair, 2)
+    assert p_scores == scores
+    assert (p_grid, p_fit, type(p_fit), p_gen) == (grid, fit, type(fit), gen)
@@ -0,0 +1,27 @@
+from src.algorithm1 import cultural_algorithm
+from src.propagation import propagate, is_consistent, solved_board
+from src.verify import verify_solution
+
+# has no solution; propagation used to stop on a value missing from a line without
+# marking the contradiction, and the CA reported a broken grid with fitness 0
+UNSOLVABLE = [
+    ([(0, 0), (0, 1), (1, 0)], 5, '+'),
+    ([(0, 2), (1, 2), (1, 1)], 8, '+'),
+    ([(2, 0), (2, 1), (2, 2)], 6, '*'),
+]
+
+
+def test_contradiction_is_reported():
+    cell_domains, cage_domains = propagate(UNSOLVABLE, 3)
+    assert not is_consistent(cell_domains, cage_domains)
+
+
+def test_solved_board_rejects_repeats():
+    domains = [[{1}, {2}, {3}], [{1}, {3}, {2}], [{3}, {2}, {1}]]
+    assert solved_board(domains) is None
+
+
+def test_ca_does_not_claim_unsolvable_puzzle():
+    grid, fit, _, _ = cultural_algorithm(UNSOLVABLE, 3, generations=20, seed=0)
+    assert fit != 0
+    assert verify_solution(UNSOLVABLE, 3, grid)
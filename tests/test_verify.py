@@ -0,0 +1,45 @@
+import random
+
+import pytest
+
+from src.algorithm2 import cage_backtracking_solve
+from src.utils import PUZZLES, puzzle_size
+from src.verify import PuzzleVerifier
+
+pytest.importorskip("numpy")
+
+
+# a solved grid and copies of it broken in the ways a stored result can be broken
+def corrupted_grids(cages, n, rng):
+    solved, _, _ = cage_backtracking_solve(cages, n)
+    grids = [solved]
+    for _ in range(200):
+        g = [list(row) for row in solved]
+        kind = rng.randrange(5)
+        r, c = rng.randrange(n), rng.randrange(n)
+        if kind == 0:
+            g[r][c] = 0  # empty cell
+        elif kind == 1:
+            g[r][c] = rng.choice([-1, n + 1, n + 5])  # out of range
+        elif kind == 2:
+            g[r][c] = g[r][(c + 1) % n]  # repeat in a row
+        elif kind == 3:
+            r2 = rng.randrange(n)
+            g[r], g[r2] = g[r2], g[r]  # swapped rows keep rows and columns Latin
+        else:
+            g[r][c] = rng.randint(1, n)  # any value
+        grids.append(g)
+    return grids
+
+
+@pytest.mark.parametrize("name", sorted(PUZZLES))
+def test_numpy_matches_python(name):
+    cages = PUZZLES[name]
+    n = puzzle_size(cages)
+    grids = corrupted_grids(cages, n, random.Random(name))
+    v = PuzzleVerifier(cages, n)
+    ok, violations = v.check(grids, use_numpy=True)
+    py_ok, py_violations = v.check(grids, use_numpy=False)
+    assert [bool(x) for x in ok] == py_ok
+    assert violations == py_violations
+    assert py_ok[0] and not all(py_ok)